@@ -0,0 +1,50 @@
+"""
+Persistent cache of detect_file_format results for the parser test scripts
+
+Detected formats are stored in _format_cache.json next to this file, keyed
+on the file path, its modification time and a hash of the detector's
+source, so editing detect_file_format invalidates every cached result.
+"""
+
+import os
+import json
+import atexit
+import hashlib
+import inspect
+
+from xrf_Pb_analysis import detect_file_format
+
+# Detected formats persisted between runs as {path: {'mtime': ns, 'detector': hash, 'format': str}}
+_FORMAT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_format_cache.json')
+
+# Identifies the detector version that produced a cached result
+_DETECTOR_HASH = hashlib.sha1(inspect.getsource(detect_file_format).encode('utf-8')).hexdigest()
+
+def _load_format_cache():
+    try:
+        with open(_FORMAT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+_format_cache = _load_format_cache()
+_format_cache_dirty = False
+
+@atexit.register
+def _save_format_cache():
+    if _format_cache_dirty:
+        with open(_FORMAT_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(_format_cache, f, indent=2)
+
+def cached_detect(file_path):
+    """detect_file_format, reusing a previous run's result if the file and detector are unchanged"""
+    global _format_cache_dirty
+    key = os.path.abspath(file_path)
+    mtime = os.stat(file_path).st_mtime_ns
+    entry = _format_cache.get(key)
+    if entry is not None and entry.get('mtime') == mtime and entry.get('detector') == _DETECTOR_HASH:
+        return entry['format']
+    format_type = detect_file_format(file_path)
+    _format_cache[key] = {'mtime': mtime, 'detector': _DETECTOR_HASH, 'format': format_type}
+    _format_cache_dirty = True
+    return format_type
@@ -1,9 +1,248 @@
 import numpy as np
+import pandas as pd
+import io
 import os
+import math
 from datetime import datetime, timedelta
-import random
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_synthetic_xrf_data(target_concentration_ppm, output_filename, base_spectrum=None):
+# Try to import numba (optional dependency) to fuse the spectrum kernels
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator: run the kernels as plain NumPy when numba is missing"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Energy range and resolution (matching real data), shared read-only by
+# every generated spectrum
+ENERGY_START = -0.4
+ENERGY_END = 40.0
+ENERGY_STEP = 0.01
+ENERGIES = np.arange(ENERGY_START, ENERGY_END + ENERGY_STEP, ENERGY_STEP)
+ENERGIES.setflags(write=False)
+N_POINTS = ENERGIES.size
+
+# Pb L-alpha peak parameters
+PB_PEAK_ENERGY = 10.52  # keV
+PB_PEAK_FWHM = 0.15     # keV (typical for XRF)
+
+# Calibration: Concentration = 13.8913 * AVE_I + 0. Working backwards, the
+# integrated intensity is concentration / 13.8913 and the Gaussian-A amplitude
+# is integrated_intensity / (FWHM * sqrt(pi/ln(2))). Scaled by the Gaussian-A
+# normalization sqrt(ln(2)/pi) / FWHM, the whole concentration -> peak height
+# chain folds into a single coefficient.
+PB_PEAK_COEF = math.log(2.0) / (13.8913 * math.pi * PB_PEAK_FWHM ** 2)
+
+# EMSA header written at the top of every spectrum file
+EMSA_HEADER = (
+    "#FORMAT      : EMSA/MAS Spectral Data File\n"
+    "#VERSION     : 1.0\n"
+    "#TITLE       : {title}\n"
+    "#DATE        : {date}\n"
+    "#TIME        : {time}\n"
+    "#OWNER       : XGT7200\n"
+    "#NPOINTS     : {npoints}.\n"
+    "#NCOLUMNS    : 1.\n"
+    "#XUNITS      : keV\n"
+    "#YUNITS      : counts\n"
+    "#DATATYPE    : XY\n"
+    "#XPERCHAN    : 0.0100000\n"
+    "#OFFSET      : -0.400000\n"
+    "#SIGNALTYPE  : EDS\n"
+    "#CHOFFSET    : 40.0000\n"
+    "#LIVETIME    : 30.000000\n"
+    "#REALTIME    : 39.525036\n"
+    "#BEAMKV      : 50.0000\n"
+    "#PROBECUR    : 596000.\n"
+    "#MAGCAM      : 100.000\n"
+    "#XTILTSTGE   : 0.0\n"
+    "#AZIMANGLE   : 0.0\n"
+    "#ELEVANGLE   : 45.0\n"
+    "#XPOSITION mm: 0.0000\n"
+    "#YPOSITION mm: 0.0000\n"
+    "#ZPOSITION mm: 0.0000\n"
+    "##OXINSTPT   : 4\n"
+    "##OXINSTSTROB: 72.02\n"
+    "#SPECTRUM    : Spectral Data Starts Here\n"
+)
+
+# Spectrum synthesis kernels. Under numba each array expression is fused into
+# a single loop over the energy grid instead of a chain of temporary arrays.
+@njit(fastmath=True, cache=True)
+def _continuum(energies):
+    """Exponential decay plus linear background component"""
+    return 50.0 * np.exp(-energies / 5.0) + 10.0 + 2.0 * energies
+
+@njit(fastmath=True, cache=True)
+def _add_scatter_features(background, energies):
+    """Add the Compton scatter peak (~9.5 keV) and Bremsstrahlung continuum"""
+    return (background
+            + 100.0 * np.exp(-((energies - 9.5) / 0.3) ** 2)
+            + 30.0 * np.exp(-energies / 15.0))
+
+@njit(fastmath=True, cache=True)
+def _gaussian_profile(energies, peak_energy, fwhm):
+    """Gaussian peak shape with unit height"""
+    return np.exp(-math.log(2.0) * ((energies - peak_energy) / fwhm) ** 2)
+
+@lru_cache(maxsize=8)
+def _pb_kernel(peak_energy, fwhm):
+    """
+    Cached unit-height Pb lineshape on the shared ENERGIES grid
+    
+    The peak shape is the same for every concentration, so it is computed
+    once and only scaled by the peak height for each sample.
+    """
+    kernel = _gaussian_profile(ENERGIES, peak_energy, fwhm)
+    kernel.setflags(write=False)  # Shared between calls
+    return kernel
+
+# Gaussians in add_gaussians are only evaluated within this many widths of
+# their centre; the neglected tail (exp(-32) ~ 1e-14 of the peak height) is
+# below float precision
+_GAUSS_SUPPORT = 8.0
+
+if HAS_NUMBA:
+    # Serial loop: test spectra are generated in worker processes, and numba's
+    # parallel thread pool is not safe to use across fork()
+    @njit(fastmath=True, cache=True)
+    def add_gaussians(out, energy, centers, amps, width):
+        """Add sum_j amps[j] * exp(-0.5*((energy-centers[j])/width)**2) to out in place"""
+        for j in range(centers.size):
+            lo = np.searchsorted(energy, centers[j] - _GAUSS_SUPPORT * width)
+            hi = np.searchsorted(energy, centers[j] + _GAUSS_SUPPORT * width)
+            for i in range(lo, hi):
+                d = (energy[i] - centers[j]) / width
+                out[i] += amps[j] * math.exp(-0.5 * d * d)
+else:
+    def add_gaussians(out, energy, centers, amps, width):
+        """Add sum_j amps[j] * exp(-0.5*((energy-centers[j])/width)**2) to out in place"""
+        bounds = np.searchsorted(energy, np.add.outer(centers, [-_GAUSS_SUPPORT * width, _GAUSS_SUPPORT * width]))
+        for (lo, hi), center, amp in zip(bounds, centers, amps):
+            out[lo:hi] += amp * np.exp(-0.5 * ((energy[lo:hi] - center) / width)**2)
+
+def build_background(energies, rng=None):
+    """
+    Build the synthetic XRF background (continuum, noise and scatter features)
+    
+    The background does not depend on the Pb concentration, so it is computed
+    once and shared by every generated spectrum.
+    
+    Parameters:
+    - energies: Energy grid in keV
+    - rng: numpy Generator for the background noise (default: seeded with 42
+      for reproducible results)
+    
+    Returns:
+    - background: Background intensity on the energy grid
+    """
+    # Create realistic background: exponential decay + linear component
+    background = _continuum(energies)
+    
+    # Add some noise and structure
+    if rng is None:
+        rng = np.random.default_rng(42)  # For reproducible results
+    noise = rng.poisson(background * 0.1)
+    background += noise
+    
+    # Add some characteristic XRF features (Compton scatter, Bremsstrahlung)
+    return _add_scatter_features(background, energies)
+
+def simulate_spectra(background, energies, concentrations, rng=None):
+    """
+    Add the concentration-dependent Pb peak and counting noise to a
+    precomputed background for a whole batch of concentrations at once
+    
+    Parameters:
+    - background: Background spectrum from build_background (not modified)
+    - energies: Energy grid in keV
+    - concentrations: Target Pb concentrations in ppm, shape (N,)
+    - rng: numpy Generator for the counting noise (default: fresh Generator)
+    
+    Returns:
+    - spectra: Simulated counts (int32), shape (N, len(energies))
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    concentrations = np.asarray(concentrations, dtype=float)
+    
+    # Peak heights from the calibration (see PB_PEAK_COEF)
+    heights = PB_PEAK_COEF * concentrations
+    
+    # Generate Pb peak (cached for the shared ENERGIES grid)
+    if energies is ENERGIES:
+        kernel = _pb_kernel(PB_PEAK_ENERGY, PB_PEAK_FWHM)
+    else:
+        kernel = _gaussian_profile(np.asarray(energies, dtype=float), PB_PEAK_ENERGY, PB_PEAK_FWHM)
+    
+    # Add the Pb peak to the background for every sample in one broadcasted
+    # (N, M) operation and apply realistic counting statistics (Poisson noise).
+    # Poisson counts are never negative and fit comfortably in int32.
+    spectra = rng.poisson(background[None, :] + heights[:, None] * kernel[None, :])
+    return spectra.astype(np.int32, copy=False)
+
+def write_spectrum(energies, spectrum, output_filename, file_time=None, rng=None):
+    """
+    Write a spectrum to disk in EMSA format
+    
+    Parameters:
+    - energies: Energy grid in keV
+    - spectrum: Counts on the energy grid
+    - output_filename: Name of output file
+    - file_time: Acquisition timestamp for the header (default: random time
+      within the next day)
+    - rng: numpy Generator for the default timestamp
+    """
+    # Generate metadata
+    if file_time is None:
+        if rng is None:
+            rng = np.random.default_rng()
+        file_time = datetime.now() + timedelta(minutes=int(rng.integers(0, 1441)))
+    
+    # Build the whole file in memory and write it in one call
+    buf = io.StringIO()
+    buf.write(EMSA_HEADER.format(
+        title=os.path.splitext(os.path.basename(output_filename))[0],
+        date=file_time.strftime('%d-%b-%Y'),
+        time=file_time.strftime('%H:%M'),
+        npoints=len(energies)))
+    
+    # Write spectral data (formatted in one vectorized call)
+    np.savetxt(buf, np.column_stack((energies, spectrum)), fmt="%.5f, %d.")
+    
+    # Write to file in EMSA format
+    with open(output_filename, 'w', buffering=1 << 20) as f:
+        f.write(buf.getvalue())
+
+def add_peak_and_write(background, energies, target_concentration_ppm, output_filename, rng=None):
+    """
+    Add the concentration-dependent Pb peak and counting noise to a
+    precomputed background, then write the spectrum in EMSA format
+    
+    Parameters:
+    - background: Background spectrum from build_background (not modified)
+    - energies: Energy grid in keV
+    - target_concentration_ppm: Target Pb concentration in ppm
+    - output_filename: Name of output file
+    - rng: numpy Generator for the counting noise and metadata
+    
+    Returns:
+    - spectrum: The simulated counts written to disk
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    spectrum = simulate_spectra(background, energies, [target_concentration_ppm], rng)[0]
+    write_spectrum(energies, spectrum, output_filename, rng=rng)
+    return spectrum
+
+def generate_synthetic_xrf_data(target_concentration_ppm, output_filename, base_spectrum=None, rng=None):
     """
     Generate synthetic XRF data with specified Pb concentration
     
@@ -11,119 +250,83 @@ def generate_synthetic_xrf_data(target_concentration_ppm, output_filename, base_
     - target_concentration_ppm: Target Pb concentration in ppm
     - output_filename: Name of output file
     - base_spectrum: Optional base spectrum to modify (for realistic background)
+    - rng: numpy Generator for the counting noise and metadata
     
     Returns:
-    - None (writes file to disk)
+    - spectrum: The simulated counts written to disk
     """
     
-    # Energy range and resolution (matching real data)
-    energy_start = -0.4
-    energy_end = 40.0
-    energy_step = 0.01
-    energies = np.arange(energy_start, energy_end + energy_step, energy_step)
-    n_points = len(energies)
-    
-    # Pb L-alpha peak parameters
-    pb_peak_energy = 10.52  # keV
-    pb_peak_fwhm = 0.15    # keV (typical for XRF)
+    energies = ENERGIES
     
     # Generate base background spectrum (realistic XRF background)
     if base_spectrum is None:
-        # Create realistic background with multiple components
-        background = np.zeros_like(energies)
-        
-        # Exponential decay background
-        background += 50 * np.exp(-energies / 5.0)
-        
-        # Linear component
-        background += 10 + 2 * energies
-        
-        # Add some noise and structure
-        np.random.seed(42)  # For reproducible results
-        noise = np.random.poisson(background * 0.1)
-        background += noise
-        
-        # Add some characteristic XRF features
-        # Compton scatter peak around 9.5 keV
-        compton_peak = 100 * np.exp(-((energies - 9.5) / 0.3)**2)
-        background += compton_peak
-        
-        # Bremsstrahlung continuum
-        brems = 30 * np.exp(-energies / 15.0)
-        background += brems
-        
-    else:
-        background = base_spectrum.copy()
+        base_spectrum = build_background(energies)
     
-    # Calculate peak amplitude based on concentration
-    # Using the calibration: Concentration = 13.8913 * AVE_I + 0
-    # We need to work backwards to get the integrated intensity
-    target_integrated_intensity = target_concentration_ppm / 13.8913
-    
-    # For Gaussian-A function, the integrated area is: A * FWHM * sqrt(pi/ln(2))
-    # So amplitude = integrated_intensity / (FWHM * sqrt(pi/ln(2)))
-    ln2 = np.log(2)
-    amplitude = target_integrated_intensity / (pb_peak_fwhm * np.sqrt(np.pi / ln2))
-    
-    # Generate Pb peak
-    pb_peak = amplitude * np.sqrt(ln2 / np.pi) / pb_peak_fwhm * np.exp(-ln2 * ((energies - pb_peak_energy) / pb_peak_fwhm)**2)
+    return add_peak_and_write(base_spectrum, energies, target_concentration_ppm, output_filename, rng)
+
+# Shared state for worker processes (set once per worker by _init_worker)
+_worker_energies = None
+
+def _init_worker(energies):
+    """Store the shared energy grid in a worker process"""
+    global _worker_energies
+    _worker_energies = energies
+
+def _write_file(task):
+    """Worker: write one precomputed spectrum file"""
+    filename, spectrum, file_time = task
+    write_spectrum(_worker_energies, spectrum, filename, file_time)
+
+def generate_files_parallel(background, energies, concentrations, filenames, max_workers=None, rng=None):
+    """
+    Generate synthetic spectrum files
     
-    # Add peak to background
-    spectrum = background + pb_peak
+    All spectra are simulated in one batched NumPy operation; the (slower)
+    text formatting of each independent file is then spread across all CPU
+    cores.
     
-    # Add realistic counting statistics (Poisson noise)
-    spectrum = np.random.poisson(spectrum)
+    Parameters:
+    - background: Shared background spectrum from build_background
+    - energies: Energy grid in keV
+    - concentrations: Target Pb concentration (ppm) for each file
+    - filenames: Output filename for each file
+    - max_workers: Number of worker processes (default: number of CPUs)
+    - rng: numpy Generator for the counting noise and metadata
     
-    # Ensure no negative values
-    spectrum = np.maximum(spectrum, 0)
+    Returns:
+    - None (writes files to disk)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    spectra = simulate_spectra(background, energies, concentrations, rng)
     
-    # Generate metadata
+    # Draw the header timestamps here so forked workers don't repeat them
     current_time = datetime.now()
-    file_time = current_time + timedelta(minutes=random.randint(0, 1440))
-    
-    # Write to file in EMSA format
-    with open(output_filename, 'w') as f:
-        f.write("#FORMAT      : EMSA/MAS Spectral Data File\n")
-        f.write("#VERSION     : 1.0\n")
-        f.write(f"#TITLE       : {os.path.splitext(os.path.basename(output_filename))[0]}\n")
-        f.write(f"#DATE        : {file_time.strftime('%d-%b-%Y')}\n")
-        f.write(f"#TIME        : {file_time.strftime('%H:%M')}\n")
-        f.write("#OWNER       : XGT7200\n")
-        f.write(f"#NPOINTS     : {n_points}.\n")
-        f.write("#NCOLUMNS    : 1.\n")
-        f.write("#XUNITS      : keV\n")
-        f.write("#YUNITS      : counts\n")
-        f.write("#DATATYPE    : XY\n")
-        f.write("#XPERCHAN    : 0.0100000\n")
-        f.write("#OFFSET      : -0.400000\n")
-        f.write("#SIGNALTYPE  : EDS\n")
-        f.write("#CHOFFSET    : 40.0000\n")
-        f.write("#LIVETIME    : 30.000000\n")
-        f.write("#REALTIME    : 39.525036\n")
-        f.write("#BEAMKV      : 50.0000\n")
-        f.write("#PROBECUR    : 596000.\n")
-        f.write("#MAGCAM      : 100.000\n")
-        f.write("#XTILTSTGE   : 0.0\n")
-        f.write("#AZIMANGLE   : 0.0\n")
-        f.write("#ELEVANGLE   : 45.0\n")
-        f.write("#XPOSITION mm: 0.0000\n")
-        f.write("#YPOSITION mm: 0.0000\n")
-        f.write("#ZPOSITION mm: 0.0000\n")
-        f.write("##OXINSTPT   : 4\n")
-        f.write("##OXINSTSTROB: 72.02\n")
-        f.write("#SPECTRUM    : Spectral Data Starts Here\n")
-        
-        # Write spectral data
-        for i, (energy, intensity) in enumerate(zip(energies, spectrum)):
-            f.write(f"{energy:.5f}, {intensity:.0f}.\n")
-    
-    return spectrum
+    offsets = rng.integers(0, 1441, size=len(filenames))
+    file_times = [current_time + timedelta(minutes=int(m)) for m in offsets]
+    tasks = zip(filenames, spectra, file_times)
+    
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(energies,)) as executor:
+        # Consume the iterator so worker errors are raised here
+        for _ in executor.map(_write_file, tasks, chunksize=8):
+            pass
 
-def create_concentration_range_datasets():
+def create_concentration_range_datasets(rng=None):
     """
     Create 100 synthetic datasets with Pb concentrations from 0 to 2000 ppm
+    
+    Parameters:
+    - rng: numpy Generator for the concentration order and counting noise
+    
+    Returns:
+    - filenames: List of generated file paths
+    - concentrations: Array of target Pb concentrations (ppm), one per file
     """
     
+    if rng is None:
+        rng = np.random.default_rng()
+    
     # Create output directory
     output_dir = "synthetic_data"
     if not os.path.exists(output_dir):
@@ -137,7 +340,9 @@ def create_concentration_range_datasets():
     concentrations = np.concatenate([np.zeros(10), concentrations])
     
     # Shuffle to randomize order
-    np.random.shuffle(concentrations)
+    rng.shuffle(concentrations)
+    
+    energies = ENERGIES
     
     # Generate base spectrum from one of the real files for realistic background
     try:
@@ -146,108 +351,102 @@ def create_concentration_range_datasets():
         real_energies = real_data[:, 0]
         real_intensities = real_data[:, 1]
         
-        # Interpolate to match our energy grid
-        from scipy.interpolate import interp1d
-        energy_start = -0.4
-        energy_end = 40.0
-        energy_step = 0.01
-        energies = np.arange(energy_start, energy_end + energy_step, energy_step)
-        
-        # Only use the background region (avoid the Pb peak)
-        bg_mask = (real_energies < 10.0) | (real_energies > 11.0)
-        bg_energies = real_energies[bg_mask]
-        bg_intensities = real_intensities[bg_mask]
-        
-        # Interpolate background
-        bg_interp = interp1d(bg_energies, bg_intensities, 
-                            bounds_error=False, fill_value=0)
-        base_spectrum = bg_interp(energies)
+        # Only use the background region (avoid the Pb peak); the energy
+        # axis is sorted, so the 10-11 keV window is a contiguous slice
+        lo = np.searchsorted(real_energies, 10.0, side='left')
+        hi = np.searchsorted(real_energies, 11.0, side='right')
+        bg_energies = np.concatenate((real_energies[:lo], real_energies[hi:]))
+        bg_intensities = np.concatenate((real_intensities[:lo], real_intensities[hi:]))
         
-        # Fill any NaN values
-        base_spectrum = np.nan_to_num(base_spectrum, nan=0.0)
+        # Interpolate background to match our energy grid (zero outside
+        # the measured range)
+        base_spectrum = np.interp(energies, bg_energies, bg_intensities, left=0.0, right=0.0)
         
     except:
         print("Warning: Could not read real data file, using synthetic background")
-        base_spectrum = None
+        base_spectrum = build_background(energies)
     
     # Generate all datasets
     print(f"Generating {len(concentrations)} synthetic XRF datasets...")
     
-    results = []
+    # Keep results as parallel columns (filenames + concentrations); the
+    # spectra themselves only live on disk
+    filenames = [None] * len(concentrations)
     for i, concentration in enumerate(concentrations):
         filename = f"synthetic_data/SYNTH_{i+1:03d}_{concentration:.1f}ppm.txt"
-        
         print(f"Generating {filename} (Pb: {concentration:.1f} ppm)")
-        
-        spectrum = generate_synthetic_xrf_data(concentration, filename, base_spectrum)
-        results.append({
-            'filename': filename,
-            'concentration': concentration,
-            'spectrum': spectrum
-        })
+        filenames[i] = filename
+    
+    generate_files_parallel(base_spectrum, energies, concentrations, filenames, rng=rng)
     
     # Create summary file
     summary_file = "synthetic_data/dataset_summary.csv"
-    with open(summary_file, 'w') as f:
-        f.write("Filename,Target_Concentration_ppm\n")
-        for result in results:
-            f.write(f"{os.path.basename(result['filename'])},{result['concentration']:.1f}\n")
+    pd.DataFrame({
+        "Filename": [os.path.basename(filename) for filename in filenames],
+        "Target_Concentration_ppm": concentrations,
+    }).to_csv(summary_file, index=False, float_format="%.1f")
     
-    print(f"\nGenerated {len(results)} synthetic datasets in '{output_dir}' directory")
+    print(f"\nGenerated {len(filenames)} synthetic datasets in '{output_dir}' directory")
     print(f"Concentration range: {min(concentrations):.1f} - {max(concentrations):.1f} ppm")
     print(f"Summary saved to: {summary_file}")
     
-    return results
+    return filenames, concentrations
 
-def create_sample_groups():
+def create_sample_groups(rng=None):
     """
     Create sample groups for batch processing (similar to real data structure)
+    
+    Parameters:
+    - rng: numpy Generator for the concentrations and counting noise
     """
+    if rng is None:
+        rng = np.random.default_rng()
     
-    # Create sample groups with multiple spectra per sample
-    sample_groups = []
+    energies = ENERGIES
     
-    # Group 1: Low concentration samples (0-50 ppm)
-    for i in range(5):
-        sample_name = f"Low_Pb_Sample_{i+1}"
-        spectra_files = []
-        for j in range(3):  # 3 spectra per sample
-            concentration = np.random.uniform(0, 50)
-            filename = f"synthetic_data/LOW_{i+1}_{j+1}_{concentration:.1f}ppm.txt"
-            generate_synthetic_xrf_data(concentration, filename)
-            spectra_files.append(filename)
-        sample_groups.append((sample_name, spectra_files))
-    
-    # Group 2: Medium concentration samples (50-500 ppm)
-    for i in range(5):
-        sample_name = f"Medium_Pb_Sample_{i+1}"
-        spectra_files = []
-        for j in range(3):  # 3 spectra per sample
-            concentration = np.random.uniform(50, 500)
-            filename = f"synthetic_data/MED_{i+1}_{j+1}_{concentration:.1f}ppm.txt"
-            generate_synthetic_xrf_data(concentration, filename)
-            spectra_files.append(filename)
-        sample_groups.append((sample_name, spectra_files))
-    
-    # Group 3: High concentration samples (500-2000 ppm)
-    for i in range(5):
-        sample_name = f"High_Pb_Sample_{i+1}"
-        spectra_files = []
-        for j in range(3):  # 3 spectra per sample
-            concentration = np.random.uniform(500, 2000)
-            filename = f"synthetic_data/HIGH_{i+1}_{j+1}_{concentration:.1f}ppm.txt"
-            generate_synthetic_xrf_data(concentration, filename)
-            spectra_files.append(filename)
-        sample_groups.append((sample_name, spectra_files))
+    # The background is shared by every spectrum, so build it only once
+    background = build_background(energies)
+    
+    # Sample groups: (sample name prefix, concentration range in ppm, file code)
+    groups_spec = [
+        ("Low_Pb_Sample", 0, 50, "LOW"),          # Low concentration samples
+        ("Medium_Pb_Sample", 50, 500, "MED"),     # Medium concentration samples
+        ("High_Pb_Sample", 500, 2000, "HIGH"),    # High concentration samples
+    ]
+    n_samples = 5
+    n_spectra = 3  # spectra per sample
+    
+    # Create sample groups with multiple spectra per sample; every spectrum
+    # is also tracked in parallel columns (sample name, file, concentration)
+    sample_groups = []
+    all_sample_names = []
+    all_concentrations = []
+    all_filenames = []
+    
+    for prefix, low, high, code in groups_spec:
+        concentrations = rng.uniform(low, high, size=(n_samples, n_spectra))
+        for i in range(n_samples):
+            spectra_files = []
+            for j in range(n_spectra):
+                filename = f"synthetic_data/{code}_{i+1}_{j+1}_{concentrations[i, j]:.1f}ppm.txt"
+                spectra_files.append(filename)
+            sample_name = f"{prefix}_{i+1}"
+            all_sample_names.extend([sample_name] * n_spectra)
+            all_filenames.extend(spectra_files)
+            sample_groups.append((sample_name, spectra_files))
+        all_concentrations.append(concentrations.ravel())
+    
+    all_concentrations = np.concatenate(all_concentrations)
+    
+    # Generate all spectra files in parallel
+    generate_files_parallel(background, energies, all_concentrations, all_filenames, rng=rng)
     
     # Create sample groups summary
-    with open("synthetic_data/sample_groups_summary.csv", 'w') as f:
-        f.write("Sample_Name,Spectrum_File,Target_Concentration_ppm\n")
-        for sample_name, spectra_files in sample_groups:
-            for spectrum_file in spectra_files:
-                # Extract concentration from filename
-                concentration = float(spectrum_file.split('_')[-1].replace('ppm.txt', ''))
-                f.write(f"{sample_name},{os.path.basename(spectrum_file)},{concentration:.1f}\n")
+    pd.DataFrame({
+        "Sample_Name": all_sample_names,
+        "Spectrum_File": [os.path.basename(filename) for filename in all_filenames],
+        "Target_Concentration_ppm": all_concentrations,
+    }).to_csv("synthetic_data/sample_groups_summary.csv", index=False, float_format="%.1f")
     
     print(f"Created {len(sample_groups)} sample groups with multiple spectra each")
     print("Sample groups summary saved to: synthetic_data/sample_groups_summary.csv")
@@ -259,7 +458,7 @@ if __name__ == "__main__":
     print("=" * 40)
     
     # Generate individual datasets
-    results = create_concentration_range_datasets()
+    filenames, concentrations = create_concentration_range_datasets()
     
     # Generate sample groups
     sample_groups = create_sample_groups()
@@ -5,6 +5,8 @@ This module provides centralized configuration for matplotlib in Qt applications
 specifically optimized for RamanLab's interface requirements.
 """
 
+import os
+
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
@@ -214,7 +216,9 @@ def get_toolbar_class(size='compact'):
 
 
 # Apply compact configuration by default when module is imported
-configure_compact_ui()
+# (skipped for headless tools that set XRF_HEADLESS)
+if not os.environ.get('XRF_HEADLESS'):
+    configure_compact_ui()
 
 
 # Export the main configuration functions and classes
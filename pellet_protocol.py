@@ -3,6 +3,94 @@
 import numpy as np
 import pandas as pd
 
+# Protocol checklist and SOP are fixed documents, built once at import
+PROTOCOL_CHECKLIST = {
+    "Sample Preparation": (
+        "Samples ground to uniform particle size (<75 μm recommended)",
+        "Sample mass measured to ±0.001g precision",
+        "Binder mass measured to ±0.001g precision", 
+        "Homogeneous mixing of sample and binder",
+        "No contamination during preparation"
+    ),
+    "Pellet Pressing": (
+        "Press pressure calibrated and consistent (5 tons)",
+        "Press time standardized (5 minutes)",
+        "Die cleaned between samples",
+        "Pellet diameter consistent (15mm ±0.1mm)",
+        "Pellet surface smooth and crack-free"
+    ),
+    "Quality Control": (
+        "Pellet mass within ±2% of target (2.4g)",
+        "Regular analysis of reference materials",
+        "Blank pellets (binder only) analyzed",
+        "Duplicate pellets from same sample show <5% RSD",
+        "Visual inspection for cracks or inhomogeneity"
+    ),
+    "XRF Measurement": (
+        "Consistent sample positioning in spectrometer",
+        "Stable excitation conditions",
+        "Appropriate measurement time for precision",
+        "Background/drift corrections applied",
+        "Spectral interference check performed"
+    )
+}
+
+SOP_TEXT = """
+STANDARD OPERATING PROCEDURE: XRF Analysis of Pb in Pressed Pellets
+
+1. SAMPLE PREPARATION
+   a) Grind sample to uniform particle size (<75 μm)
+   b) Weigh 2.000 ± 0.001 g of ground sample
+   c) Weigh 0.400 ± 0.001 g of binder
+   d) Mix thoroughly for 2 minutes
+   e) Record sample ID, masses, and preparation date
+
+2. PELLET PRESSING
+   a) Clean die with appropriate solvent
+   b) Transfer mixture to 15mm die
+   c) Apply 5 tons pressure for 5 minutes
+   d) Remove pellet and inspect for defects
+   e) Weigh pellet (target: 2.40 ± 0.05 g)
+
+3. XRF INSTRUMENT SETUP
+   a) X-ray tube voltage: 50 kV
+   b) X-ray tube current: Auto (optimize for 15-25% dead time)
+   c) Beam size: 1.2 mm
+   d) Filters: None
+   e) Detector: Si detector
+   f) Target dead time: 20% ± 5%
+
+4. XRF MEASUREMENT
+   a) Position pellet in sample holder (ensure 1.2mm beam hits sample)
+   b) Optimize tube current to achieve 15-25% dead time
+   c) Measure for 30 seconds (measurement time, not real time)
+   d) Record dead time percentage for each measurement
+   e) Collect 6 replicate measurements minimum
+   f) Monitor count rate stability during measurement
+
+5. DATA ANALYSIS
+   a) Verify dead time was within 15-25% range
+   b) Calculate mean integrated intensity from live time data
+   c) Apply calibration: Conc = 13.8913 × Intensity + 0
+   d) Correct for dilution factor: Original_Conc = Pellet_Conc / 0.833
+   e) Calculate statistics (mean, SD, RSD)
+   f) Report results with uncertainty
+
+6. QUALITY CONTROL
+   a) Analyze reference material every 10 samples
+   b) Analyze blank pellet (binder only) daily
+   c) Check dead time optimization weekly
+   d) Verify beam positioning with alignment standards
+   e) Monitor tube current stability
+   f) Document any deviations or issues
+
+7. TROUBLESHOOTING
+   a) If dead time <15%: Increase tube current or check sample positioning
+   b) If dead time >25%: Decrease tube current or check for contamination
+   c) If count rate unstable: Check tube stability and sample surface
+   d) If poor precision: Verify pellet homogeneity and measurement statistics
+"""
+
 class PelletBasedXRFAnalysis:
     """
     XRF analysis optimized for pressed pellet samples with standardized preparation
@@ -71,38 +159,11 @@ class PelletBasedXRFAnalysis:
     def protocol_validation_checklist(self):
         """
         Generate a validation checklist for the pellet preparation protocol
+        
+        Returns a fresh dict of lists, so callers may extend it without
+        changing the shared PROTOCOL_CHECKLIST.
         """
-        checklist = {
-            "Sample Preparation": [
-                "Samples ground to uniform particle size (<75 μm recommended)",
-                "Sample mass measured to ±0.001g precision",
-                "Binder mass measured to ±0.001g precision", 
-                "Homogeneous mixing of sample and binder",
-                "No contamination during preparation"
-            ],
-            "Pellet Pressing": [
-                "Press pressure calibrated and consistent (5 tons)",
-                "Press time standardized (5 minutes)",
-                "Die cleaned between samples",
-                "Pellet diameter consistent (15mm ±0.1mm)",
-                "Pellet surface smooth and crack-free"
-            ],
-            "Quality Control": [
-                "Pellet mass within ±2% of target (2.4g)",
-                "Regular analysis of reference materials",
-                "Blank pellets (binder only) analyzed",
-                "Duplicate pellets from same sample show <5% RSD",
-                "Visual inspection for cracks or inhomogeneity"
-            ],
-            "XRF Measurement": [
-                "Consistent sample positioning in spectrometer",
-                "Stable excitation conditions",
-                "Appropriate measurement time for precision",
-                "Background/drift corrections applied",
-                "Spectral interference check performed"
-            ]
-        }
-        return checklist
+        return {category: list(items) for category, items in PROTOCOL_CHECKLIST.items()}
     
     def estimate_uncertainty_budget(self, 
                                   weighing_precision=0.001,  # g
@@ -191,62 +252,7 @@ class PelletBasedXRFAnalysis:
     
     def generate_sop(self):
         """Generate Standard Operating Procedure document"""
-        sop = """
-STANDARD OPERATING PROCEDURE: XRF Analysis of Pb in Pressed Pellets
-
-1. SAMPLE PREPARATION
-   a) Grind sample to uniform particle size (<75 μm)
-   b) Weigh 2.000 ± 0.001 g of ground sample
-   c) Weigh 0.400 ± 0.001 g of binder
-   d) Mix thoroughly for 2 minutes
-   e) Record sample ID, masses, and preparation date
-
-2. PELLET PRESSING
-   a) Clean die with appropriate solvent
-   b) Transfer mixture to 15mm die
-   c) Apply 5 tons pressure for 5 minutes
-   d) Remove pellet and inspect for defects
-   e) Weigh pellet (target: 2.40 ± 0.05 g)
-
-3. XRF INSTRUMENT SETUP
-   a) X-ray tube voltage: 50 kV
-   b) X-ray tube current: Auto (optimize for 15-25% dead time)
-   c) Beam size: 1.2 mm
-   d) Filters: None
-   e) Detector: Si detector
-   f) Target dead time: 20% ± 5%
-
-4. XRF MEASUREMENT
-   a) Position pellet in sample holder (ensure 1.2mm beam hits sample)
-   b) Optimize tube current to achieve 15-25% dead time
-   c) Measure for 30 seconds (measurement time, not real time)
-   d) Record dead time percentage for each measurement
-   e) Collect 6 replicate measurements minimum
-   f) Monitor count rate stability during measurement
-
-5. DATA ANALYSIS
-   a) Verify dead time was within 15-25% range
-   b) Calculate mean integrated intensity from live time data
-   c) Apply calibration: Conc = 13.8913 × Intensity + 0
-   d) Correct for dilution factor: Original_Conc = Pellet_Conc / 0.833
-   e) Calculate statistics (mean, SD, RSD)
-   f) Report results with uncertainty
-
-6. QUALITY CONTROL
-   a) Analyze reference material every 10 samples
-   b) Analyze blank pellet (binder only) daily
-   c) Check dead time optimization weekly
-   d) Verify beam positioning with alignment standards
-   e) Monitor tube current stability
-   f) Document any deviations or issues
-
-7. TROUBLESHOOTING
-   a) If dead time <15%: Increase tube current or check sample positioning
-   b) If dead time >25%: Decrease tube current or check for contamination
-   c) If count rate unstable: Check tube stability and sample surface
-   d) If poor precision: Verify pellet homogeneity and measurement statistics
-"""
-        return sop
+        return SOP_TEXT
 
 # Example usage
 def validate_protocol():
@@ -259,24 +265,20 @@ def validate_protocol():
     print("PELLET PREPARATION PROTOCOL VALIDATION")
     print("=" * 50)
     
-    for category, items in checklist.items():
-        print(f"\n{category}:")
-        for item in items:
-            print(f"  ☐ {item}")
+    print("\n".join(f"\n{category}:\n" + "\n".join(f"  ☐ {item}" for item in items)
+                    for category, items in checklist.items()))
     
     # Calculate uncertainty budget
     uncertainty = analyzer.estimate_uncertainty_budget()
     print(f"\nUNCERTAINTY BUDGET")
     print("=" * 30)
-    for source, value in uncertainty.items():
-        print(f"{source}: {value:.2f}")
+    print("\n".join(f"{source}: {value:.2f}" for source, value in uncertainty.items()))
     
     # Measurement optimization
     optimization = analyzer.optimize_measurement_conditions(target_precision_rsd=2.0)
     print(f"\nMEASUREMENT OPTIMIZATION")
     print("=" * 35)
-    for param, value in optimization.items():
-        print(f"{param}: {value}")
+    print("\n".join(f"{param}: {value}" for param, value in optimization.items()))
     
     return analyzer
 
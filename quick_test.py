@@ -5,7 +5,6 @@ Quick test of file reading
 
 import sys
 import os
-import pandas as pd
 import numpy as np
 
 # Test reading one of our synthetic files
@@ -14,18 +13,19 @@ test_file = "/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb/te
 if os.path.exists(test_file):
     print(f"Testing file: {test_file}")
     
-    # Test pandas reading
+    # Test numpy reading (plain two-column numeric CSV)
     try:
-        df = pd.read_csv(test_file)
-        print(f"✅ Pandas read successful: {len(df)} rows")
-        print(f"Columns: {list(df.columns)}")
+        with open(test_file) as f:
+            columns = f.readline().strip().split(',')
+        data = np.loadtxt(test_file, delimiter=',', skiprows=1)
+        print(f"✅ NumPy read successful: {len(data)} rows")
+        print(f"Columns: {columns}")
         print(f"First few rows:")
-        print(df.head())
+        print(data[:5])
         
         # Extract data
-        if 'Energy_keV' in df.columns and 'Intensity' in df.columns:
-            x = df['Energy_keV'].values
-            y = df['Intensity'].values
+        if columns[:2] == ['Energy_keV', 'Intensity']:
+            x, y = data[:, 0], data[:, 1]
             print(f"✅ Data extraction successful: {len(x)} points")
             print(f"Energy range: {x.min():.2f} - {x.max():.2f} keV")
             print(f"Intensity range: {y.min():.0f} - {y.max():.0f} counts")
@@ -33,6 +33,6 @@ if os.path.exists(test_file):
             print("❌ Expected columns not found")
             
     except Exception as e:
-        print(f"❌ Pandas error: {e}")
+        print(f"❌ NumPy error: {e}")
 else:
     print("Test file not found")
@@ -6,8 +6,23 @@ Test just the CalibrationManager class without GUI dependencies
 import sys
 import os
 import json
+from pathlib import Path
 from datetime import datetime
 
+# Try to import orjson (optional dependency) for faster calibration file I/O
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2).encode('utf-8')
+    
+    _loads = json.loads
+
 # Define the CalibrationManager class directly for testing
 class CalibrationManager:
     """Manages persistent storage and retrieval of element calibrations"""
@@ -15,13 +30,24 @@ class CalibrationManager:
     def __init__(self, calibration_file="xrf_calibrations.json"):
         self.calibration_file = calibration_file
         self.calibrations = self.load_calibrations()
+        self._defer_save = False
+    
+    def __enter__(self):
+        """Batch updates: defer saving to disk until the block exits"""
+        self._defer_save = True
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._defer_save = False
+        self.save_calibrations()
+        return False
     
     def load_calibrations(self):
         """Load calibrations from file"""
         if os.path.exists(self.calibration_file):
             try:
-                with open(self.calibration_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.calibration_file, 'rb') as f:
+                    data = _loads(f.read())
                 print(f"Loaded calibrations from {self.calibration_file}")
                 return data
             except Exception as e:
@@ -32,8 +58,8 @@ class CalibrationManager:
     def save_calibrations(self):
         """Save calibrations to file"""
         try:
-            with open(self.calibration_file, 'w') as f:
-                json.dump(self.calibrations, f, indent=2)
+            with open(self.calibration_file, 'wb') as f:
+                f.write(_dumps(self.calibrations))
             print(f"Saved calibrations to {self.calibration_file}")
         except Exception as e:
             print(f"Error saving calibrations: {e}")
@@ -52,7 +78,8 @@ class CalibrationManager:
             'equation': f"Concentration = {slope:.4f} × Intensity + {intercept:.4f}"
         })
         
-        self.save_calibrations()
+        if not self._defer_save:
+            self.save_calibrations()
         print(f"Updated calibration for {element}")
     
     def get_calibration(self, element):
@@ -67,20 +94,20 @@ class CalibrationManager:
         """Get all calibrations"""
         return self.calibrations.copy()
 
-def test_calibration_manager():
+def test_calibration_manager(verbose=False):
     """Test the CalibrationManager functionality"""
-    print("🧪 Testing Persistent Calibration System")
-    print("=" * 50)
+    _emit = print if verbose else (lambda *args, **kwargs: None)
+    _emit("🧪 Testing Persistent Calibration System")
+    _emit("=" * 50)
     
     # Create test calibration manager
     test_file = "test_calibrations.json"
-    if os.path.exists(test_file):
-        os.remove(test_file)  # Start fresh
+    Path(test_file).unlink(missing_ok=True)  # Start fresh
     
     cal_mgr = CalibrationManager(test_file)
     
     # Test 1: Add calibrations
-    print("\n1. Testing calibration creation...")
+    _emit("\n1. Testing calibration creation...")
     test_calibrations = {
         'Pb': {'slope': 13.8913, 'intercept': 0.0, 'r_squared': 0.9901, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']},
         'Zn': {'slope': 0.2587, 'intercept': -9.3618, 'r_squared': 0.9999, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']},
@@ -88,42 +115,43 @@ def test_calibration_manager():
         'Cr': {'slope': 0.4627, 'intercept': -27.6859, 'r_squared': 0.9987, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']}
     }
     
-    for element, data in test_calibrations.items():
-        cal_mgr.update_calibration(
-            element, data['slope'], data['intercept'], 
-            data['r_squared'], data['standards']
-        )
-        print(f"  ✓ Added calibration for {element}")
+    with cal_mgr:  # Save once after all updates
+        for element, data in test_calibrations.items():
+            cal_mgr.update_calibration(
+                element, data['slope'], data['intercept'], 
+                data['r_squared'], data['standards']
+            )
+            _emit(f"  ✓ Added calibration for {element}")
     
     # Test 2: Verify persistence
-    print("\n2. Testing calibration persistence...")
+    _emit("\n2. Testing calibration persistence...")
     cal_mgr2 = CalibrationManager(test_file)  # Load from file
     
     for element in test_calibrations.keys():
         if cal_mgr2.has_calibration(element):
             cal_data = cal_mgr2.get_calibration(element)
-            print(f"  ✓ {element}: {cal_data['equation']}")
+            _emit(f"  ✓ {element}: {cal_data['equation']}")
         else:
-            print(f"  ✗ {element}: Not found!")
+            _emit(f"  ✗ {element}: Not found!")
     
     # Test 3: File format
-    print("\n3. Testing calibration file format...")
+    _emit("\n3. Testing calibration file format...")
     if os.path.exists(test_file):
-        with open(test_file, 'r') as f:
+        with open(test_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
         
-        print("Sample calibration file format:")
+        _emit("Sample calibration file format:")
         pb_cal = data.get('Pb', {})
-        print(f"  Pb calibration:")
+        _emit(f"  Pb calibration:")
         for key, value in pb_cal.items():
-            print(f"    {key}: {value}")
+            _emit(f"    {key}: {value}")
     
     # Test 4: Calibration status
-    print("\n4. Testing calibration status...")
+    _emit("\n4. Testing calibration status...")
     all_cals = cal_mgr2.get_all_calibrations()
     
-    print(f"📊 Calibration Status Summary:")
-    print(f"   Total calibrations: {len(all_cals)}")
+    _emit(f"📊 Calibration Status Summary:")
+    _emit(f"   Total calibrations: {len(all_cals)}")
     
     elements = ['Pb', 'Zn', 'Cu', 'Cr', 'As', 'Ni', 'Fe', 'S', 'Cd', 'Se']
     for element in elements:
@@ -131,19 +159,18 @@ def test_calibration_manager():
             cal = all_cals[element]
             standards_count = len(cal.get('standards_used', []))
             r_squared = cal.get('r_squared', 'N/A')
-            print(f"   ✅ {element}: R²={r_squared:.4f}, Standards={standards_count}")
+            _emit(f"   ✅ {element}: R²={r_squared:.4f}, Standards={standards_count}")
         else:
-            print(f"   ⚠️  {element}: Using default calibration")
+            _emit(f"   ⚠️  {element}: Using default calibration")
     
     # Cleanup
-    if os.path.exists(test_file):
-        os.remove(test_file)
+    Path(test_file).unlink(missing_ok=True)
     
-    print("\n✅ All calibration persistence tests passed!")
+    _emit("\n✅ All calibration persistence tests passed!")
 
 def main():
     """Run calibration persistence tests"""
-    test_calibration_manager()
+    test_calibration_manager(verbose=True)
     
     print("\n" + "🎉" * 20)
     print("🎯 PERSISTENT CALIBRATION SYSTEM READY!")
@@ -6,10 +6,21 @@ Complete test of the multi-element XRF analysis workflow
 import sys
 import os
 import numpy as np
-import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import ELEMENT_DEFINITIONS, REFERENCE_MATERIALS, MultiElementProcessingThread, XRFPeakFitter
+from xrf_Pb_analysis import ELEMENT_DEFINITIONS, ELEM_ARR, ELEM_IDX, REFERENCE_MATERIALS, MultiElementProcessingThread, XRFPeakFitter, build_reference_ppm_table
+from generate_synthetic_data import add_gaussians
+
+# Shared random generator for the synthetic data (seeded for reproducible tests)
+_RNG = np.random.default_rng(0)
+
+def _save_spectrum_csv(task):
+    """Worker: save one spectrum as CSV"""
+    filepath, energy, spectrum = task
+    np.savetxt(filepath, np.column_stack((energy, spectrum)), delimiter=',',
+               header='Energy_keV,Intensity', comments='', fmt='%.10g')
+    return filepath
 
 def create_test_workflow_files():
     """Create test files for complete workflow testing"""
@@ -24,44 +35,44 @@ def create_test_workflow_files():
         'Sample_2': {'Pb': 98, 'Zn': 156, 'Cu': 68, 'Cr': 102}
     }
     
-    created_files = []
+    write_tasks = []
+    n_spectra = 3  # spectra per sample
+    
+    # Energy grid, background and peak positions are shared by all spectra
+    elements = list(next(iter(sample_concentrations.values())))
+    energy = np.linspace(0.5, 30.0, 3000)
+    baseline = 1000 * np.exp(-energy/10) + 50
+    centers = ELEM_ARR['energy'][[ELEM_IDX[element] for element in elements]]
+    peak_width = 0.15
+    
+    # Add some variation between spectra (5%): one draw for every sample,
+    # spectrum and element, indexed as variations[sample, spectrum, element]
+    variations = _RNG.normal(1.0, 0.05, size=(len(sample_concentrations), n_spectra, len(elements)))
     
     for sample_num, (sample_name, concentrations) in enumerate(sample_concentrations.items(), 1):
-        for spectrum_num in range(1, 4):  # 3 spectra per sample
+        concs = np.array([concentrations[element] for element in elements])
+        peak_intensities = concs * 10 * variations[sample_num - 1] + 100
+        
+        # Synthetic multi-element spectra, one per row
+        spectra = np.tile(baseline, (n_spectra, 1))
+        for spectrum, amps in zip(spectra, peak_intensities):
+            add_gaussians(spectrum, energy, centers, amps, peak_width)
+        
+        # Add noise
+        expected = spectra * 0.1
+        spectra += _RNG.poisson(expected) - expected
+        np.clip(spectra, 1.0, None, out=spectra)  # No negative values
+        
+        for spectrum_num in range(1, n_spectra + 1):
             filename = f"sample_{sample_num}_spectrum_{spectrum_num}.csv"
-            filepath = os.path.join(test_dir, filename)
-            
-            # Create synthetic multi-element spectrum
-            energy = np.linspace(0.5, 30.0, 3000)
-            baseline = 1000 * np.exp(-energy/10) + 50
-            
-            # Add peaks for each element
-            for element, concentration in concentrations.items():
-                element_data = ELEMENT_DEFINITIONS[element]
-                primary_energy = element_data['primary_energy']
-                
-                # Add some variation between spectra
-                variation = np.random.normal(1.0, 0.05)  # 5% variation
-                peak_intensity = concentration * 10 * variation + 100
-                peak_width = 0.15
-                
-                peak = peak_intensity * np.exp(-0.5 * ((energy - primary_energy) / peak_width)**2)
-                baseline += peak
-            
-            # Add noise
-            noise = np.random.poisson(baseline * 0.1) - baseline * 0.1
-            spectrum = baseline + noise
-            spectrum = np.maximum(spectrum, 1)  # No negative values
-            
-            # Save as CSV
-            df = pd.DataFrame({
-                'Energy_keV': energy,
-                'Intensity': spectrum
-            })
-            df.to_csv(filepath, index=False)
-            
-            created_files.append(filepath)
-            print(f"Created: {filename}")
+            write_tasks.append((os.path.join(test_dir, filename), energy, spectra[spectrum_num - 1]))
+    
+    # The files are independent, so write them in parallel
+    with ProcessPoolExecutor() as executor:
+        created_files = list(executor.map(_save_spectrum_csv, write_tasks))
+    
+    for filepath in created_files:
+        print(f"Created: {os.path.basename(filepath)}")
     
     return test_dir, created_files
 
@@ -99,13 +110,15 @@ def test_element_fitters():
     """Test individual element fitters"""
     print("\nTesting Element Fitters...")
     
-    for element in ['Pb', 'Zn', 'Cu', 'Cr']:
+    elements = ['Pb', 'Zn', 'Cu', 'Cr']
+    expected_energies = ELEM_ARR['energy'][[ELEM_IDX[element] for element in elements]].tolist()
+    
+    for element, expected_energy in zip(elements, expected_energies):
         try:
             fitter = XRFPeakFitter(element=element)
-            element_data = ELEMENT_DEFINITIONS[element]
             
             print(f"✓ {element} fitter:")
-            print(f"    Energy: {fitter.target_energy} keV (expected: {element_data['primary_energy']})")
+            print(f"    Energy: {fitter.target_energy} keV (expected: {expected_energy})")
             print(f"    Calibration: {fitter.calibration_slope:.4f}x + {fitter.calibration_intercept:.4f}")
             
         except Exception as e:
@@ -117,32 +130,15 @@ def test_calibration_coverage():
     
     test_elements = ['Pb', 'Zn', 'Cu', 'Cr']
     
+    ref_ppm = build_reference_ppm_table(REFERENCE_MATERIALS)
+    
     for element in test_elements:
-        available_standards = []
-        concentrations = []
-        
-        for material_name, material_data in REFERENCE_MATERIALS.items():
-            value = material_data.get(element)
-            if value is not None and value != "N/A":
-                try:
-                    if isinstance(value, str):
-                        if '%' in value:
-                            if '<' in value:
-                                continue
-                            conc = float(value.replace('%', '')) * 10000
-                        else:
-                            conc = float(value)
-                    else:
-                        conc = float(value)
-                    
-                    available_standards.append(material_name)
-                    concentrations.append(conc)
-                except (ValueError, TypeError):
-                    continue
+        column = ref_ppm[element].dropna()
+        available_standards, concentrations = column.index.tolist(), column.values
         
         print(f"✓ {element}: {len(available_standards)} standards available")
-        if concentrations:
-            print(f"    Range: {min(concentrations):.1f} - {max(concentrations):.1f} ppm")
+        if len(concentrations):
+            print(f"    Range: {concentrations.min():.1f} - {concentrations.max():.1f} ppm")
 
 def main():
     print("🧪 Complete Multi-Element XRF Workflow Test")
@@ -7,7 +7,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import XRFPeakFittingGUI, parse_xrf_file_smart
+from xrf_Pb_analysis import read_xrf_file, parse_xrf_file_smart
 
 def test_file_loading():
     """Test that file loading works correctly"""
@@ -17,10 +17,10 @@ def test_file_loading():
     test_dir = "/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb/test_spectra"
     
     if os.path.exists(test_dir):
-        test_files = [f for f in os.listdir(test_dir) if f.endswith('.csv')]
+        test_files = [e.path for e in os.scandir(test_dir) if e.is_file() and e.name.endswith('.csv')]
         
         if test_files:
-            test_file = os.path.join(test_dir, test_files[0])
+            test_file = test_files[0]
             print(f"Testing with: {test_file}")
             
             # Test the smart parser directly
@@ -35,28 +35,27 @@ def test_file_loading():
             except Exception as e:
                 print(f"❌ Smart parser error: {e}")
             
-            # Test the GUI method
+            # Test the file reader used by the GUI (no window needed)
             try:
-                gui = XRFPeakFittingGUI()
-                data = gui.read_xrf_file(test_file)
+                data = read_xrf_file(test_file)
                 if data is not None:
                     x, y = data
-                    print(f"✅ GUI read_xrf_file works: {len(x)} data points")
+                    print(f"✅ read_xrf_file works: {len(x)} data points")
                 else:
-                    print("❌ GUI read_xrf_file failed")
+                    print("❌ read_xrf_file failed")
             except Exception as e:
-                print(f"❌ GUI read_xrf_file error: {e}")
+                print(f"❌ read_xrf_file error: {e}")
         else:
             print("No test files found")
     else:
         print("Test directory not found")
     
     # Test with any existing files in the main directory
-    main_files = [f for f in os.listdir("/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb") 
-                  if f.endswith(('.txt', '.csv')) and 'test' not in f.lower()]
+    main_files = [e.path for e in os.scandir("/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb")
+                  if e.is_file() and e.name.endswith(('.txt', '.csv')) and 'test' not in e.name.lower()]
     
     if main_files:
-        test_file = os.path.join("/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb", main_files[0])
+        test_file = main_files[0]
         print(f"\nTesting with real file: {test_file}")
         
         try:
@@ -7,7 +7,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import ELEMENT_DEFINITIONS, REFERENCE_MATERIALS, XRFPeakFitter
+from xrf_Pb_analysis import ELEMENT_DEFINITIONS, REFERENCE_MATERIALS, XRFPeakFitter, build_reference_ppm_table
 
 def test_element_definitions():
     """Test that all elements are properly defined"""
@@ -84,32 +84,23 @@ def test_calibration_data_parsing():
     print("Testing Calibration Data Parsing...")
     
     test_element = 'Pb'
-    available_standards = []
-    concentrations = []
+    ref_ppm = build_reference_ppm_table(REFERENCE_MATERIALS)[test_element]
     
-    for material_name, material_data in REFERENCE_MATERIALS.items():
-        value = material_data.get(test_element)
-        if value is not None and value != "N/A":
-            try:
-                if isinstance(value, str):
-                    # Handle percentage values
-                    if '%' in value:
-                        if '<' in value:
-                            print(f"  {material_name}: Below detection limit ({value})")
-                            continue
-                        conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                        print(f"  {material_name}: {value} → {conc} ppm")
-                    else:
-                        conc = float(value)
-                        print(f"  {material_name}: {conc} ppm")
-                else:
-                    conc = float(value)
-                    print(f"  {material_name}: {conc} ppm")
-                
-                available_standards.append(material_name)
-                concentrations.append(conc)
-            except (ValueError, TypeError) as e:
-                print(f"  {material_name}: Error parsing '{value}' - {e}")
+    for material_name, conc in ref_ppm.items():
+        value = REFERENCE_MATERIALS[material_name].get(test_element)
+        if value is None or value == "N/A":
+            continue
+        if isinstance(value, str) and '<' in value:
+            print(f"  {material_name}: Below detection limit ({value})")
+        elif conc != conc:  # NaN: value could not be parsed
+            print(f"  {material_name}: Error parsing '{value}'")
+        elif isinstance(value, str) and '%' in value:
+            print(f"  {material_name}: {value} → {conc} ppm")
+        else:
+            print(f"  {material_name}: {conc} ppm")
+    
+    usable = ref_ppm.dropna()
+    available_standards, concentrations = usable.index.tolist(), usable.values
     
     print(f"\nUsable standards for {test_element}: {len(available_standards)}")
     print(f"Concentration range: {min(concentrations):.1f} - {max(concentrations):.1f} ppm")
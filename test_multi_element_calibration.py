@@ -5,9 +5,43 @@ Test the multi-element calibration functionality
 
 import sys
 import os
+import numpy as np
+from itertools import chain
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import ELEMENT_DEFINITIONS, REFERENCE_MATERIALS
+from xrf_Pb_analysis import ELEM_ARR, REF_CONC, REF_VALID, REF_MATERIAL_NAMES
+
+# Try to import numba (optional dependency) to fuse the per-element summaries
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+if HAS_NUMBA:
+    # Serial loop: numba's parallel thread pool is not safe to use across
+    # fork(), and other tests in the same run use process pools
+    @njit(cache=True)
+    def _summarize(conc, valid):
+        """Per-column (count, min, max) of the valid entries of a materials x elements grid"""
+        n_materials, n_elements = conc.shape
+        counts = np.zeros(n_elements, dtype=np.int64)
+        mins = np.full(n_elements, np.inf)
+        maxs = np.full(n_elements, -np.inf)
+        for j in range(n_elements):
+            for i in range(n_materials):
+                if valid[i, j]:
+                    counts[j] += 1
+                    mins[j] = min(mins[j], conc[i, j])
+                    maxs[j] = max(maxs[j], conc[i, j])
+        return counts, mins, maxs
+else:
+    def _summarize(conc, valid):
+        """Per-column (count, min, max) of the valid entries of a materials x elements grid"""
+        counts = valid.sum(axis=0)
+        mins = np.where(valid, conc, np.inf).min(axis=0)
+        maxs = np.where(valid, conc, -np.inf).max(axis=0)
+        return counts, mins, maxs
 
 def test_multi_element_calibration_logic():
     """Test the logic for finding calibratable elements"""
@@ -16,53 +50,33 @@ def test_multi_element_calibration_logic():
     
     # Find elements with sufficient standards (at least 2)
     calibratable_elements = []
+    calibratable_meta = []  # (name, primary energy, min, max) for each calibratable element
+    
+    # Element metadata looked up once
+    elem_meta = list(zip(ELEM_ARR['symbol'].tolist(), ELEM_ARR['name'].tolist(), ELEM_ARR['energy'].tolist()))
     
-    for element in ELEMENT_DEFINITIONS.keys():
-        available_standards = []
-        concentrations = []
-        
-        for material_name, material_data in REFERENCE_MATERIALS.items():
-            value = material_data.get(element)
-            if value is not None and value != "N/A":
-                try:
-                    if isinstance(value, str):
-                        if '%' in value:
-                            if '<' in value:
-                                continue  # Skip below detection limit values
-                            conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                        else:
-                            conc = float(value)
-                    else:
-                        conc = float(value)
-                    
-                    available_standards.append(material_name)
-                    concentrations.append(conc)
-                except (ValueError, TypeError):
-                    continue
-        
-        if len(available_standards) >= 2:
-            calibratable_elements.append((element, available_standards, concentrations))
+    # Concentrations of every element in every material are parsed at import
+    # (columns in ELEMENT_DEFINITIONS order, as in ELEM_ARR)
+    counts, mins, maxs = _summarize(REF_CONC, REF_VALID)
+    materials = np.array(REF_MATERIAL_NAMES)
+    
+    for j in np.flatnonzero(counts >= 2):
+        element, element_name, energy = elem_meta[j]
+        column_valid = REF_VALID[:, j]
+        calibratable_elements.append((element, materials[column_valid].tolist(), REF_CONC[column_valid, j]))
+        calibratable_meta.append((element_name, energy, mins[j], maxs[j]))
     
     print(f"Found {len(calibratable_elements)} calibratable elements:")
     print()
     
-    for element, standards, concentrations in calibratable_elements:
-        element_name = ELEMENT_DEFINITIONS[element]['name']
-        energy = ELEMENT_DEFINITIONS[element]['primary_energy']
-        min_conc = min(concentrations)
-        max_conc = max(concentrations)
-        
+    for (element, standards, concentrations), (element_name, energy, min_conc, max_conc) in zip(calibratable_elements, calibratable_meta):
         print(f"🔹 {element} ({element_name}) - {energy} keV")
         print(f"   Standards: {len(standards)} ({', '.join(standards)})")
         print(f"   Range: {min_conc:.1f} - {max_conc:.1f} ppm")
         print()
     
     # Get all unique reference materials needed
-    all_materials = set()
-    for element, standards, concentrations in calibratable_elements:
-        all_materials.update(standards)
-    
-    all_materials = sorted(list(all_materials))
+    all_materials = sorted(dict.fromkeys(chain.from_iterable(standards for _, standards, _ in calibratable_elements)))
     
     print(f"📁 Reference materials needed: {len(all_materials)}")
     for material in all_materials:
@@ -9,6 +9,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from xrf_Pb_analysis import ELEMENT_DEFINITIONS
 
+# Element symbols never change after import, so collect them once
+_ALL_ELEMENTS = tuple(ELEMENT_DEFINITIONS)
+
 def test_multi_element_workflow():
     """Test the multi-element workflow logic"""
     print("Testing Multi-Element Workflow")
@@ -16,17 +19,17 @@ def test_multi_element_workflow():
     
     # Test element selection
     print("Available elements for selection:")
+    element_line = "  ✓ {} ({}) - {} keV".format
     for element, data in ELEMENT_DEFINITIONS.items():
-        print(f"  ✓ {element} ({data['name']}) - {data['primary_energy']} keV")
+        print(element_line(element, data['name'], data['primary_energy']))
     
-    print(f"\nTotal elements available: {len(ELEMENT_DEFINITIONS)}")
+    print(f"\nTotal elements available: {len(_ALL_ELEMENTS)}")
     
     # Test element groupings
     common_elements = ['Pb', 'Zn', 'Cu', 'Cr']
     print(f"\nCommon elements: {common_elements}")
     
-    all_elements = list(ELEMENT_DEFINITIONS.keys())
-    print(f"All elements: {all_elements}")
+    print(f"All elements: {_ALL_ELEMENTS}")
     
     # Test workflow scenarios
     print("\n" + "=" * 50)
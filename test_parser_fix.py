@@ -7,7 +7,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import parse_xrf_file_smart
+from xrf_Pb_analysis import parse_xrf_file_cached
+from format_detection_cache import cached_detect
 
 # Test with synthetic file
 test_file = "/Users/aaroncelestian/Library/CloudStorage/Dropbox/Python/XRF_Pb/test_spectra/Zn_Till_1_synthetic.csv"
@@ -16,7 +17,7 @@ if os.path.exists(test_file):
     print(f"Testing parser with: {test_file}")
     
     try:
-        x, y, format_type = parse_xrf_file_smart(test_file)
+        x, y, format_type = parse_xrf_file_cached(test_file, cached_detect(test_file))
         if x is not None and y is not None:
             print(f"✅ Parser works: {len(x)} data points, format: {format_type}")
             print(f"   Energy range: {x.min():.2f} - {x.max():.2f} keV")
@@ -6,24 +6,39 @@ Test the persistent calibration system
 import sys
 import os
 import json
+from pathlib import Path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from xrf_Pb_analysis import CalibrationManager, ELEMENT_DEFINITIONS
+from xrf_Pb_analysis import CalibrationManager, ELEM_ARR
 
-def test_calibration_manager():
+# Try to import orjson (optional dependency) for faster JSON reading and printing
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2)
+    
+    _loads = json.loads
+
+def test_calibration_manager(verbose=False):
     """Test the CalibrationManager functionality"""
-    print("🧪 Testing Persistent Calibration System")
-    print("=" * 50)
+    _emit = print if verbose else (lambda *args, **kwargs: None)
+    _emit("🧪 Testing Persistent Calibration System")
+    _emit("=" * 50)
     
     # Create test calibration manager
     test_file = "test_calibrations.json"
-    if os.path.exists(test_file):
-        os.remove(test_file)  # Start fresh
+    Path(test_file).unlink(missing_ok=True)  # Start fresh
     
     cal_mgr = CalibrationManager(test_file)
     
     # Test 1: Add calibrations
-    print("\n1. Testing calibration creation...")
+    _emit("\n1. Testing calibration creation...")
     test_calibrations = {
         'Pb': {'slope': 13.8913, 'intercept': 0.0, 'r_squared': 0.9901, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']},
         'Zn': {'slope': 0.2587, 'intercept': -9.3618, 'r_squared': 0.9999, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']},
@@ -31,62 +46,63 @@ def test_calibration_manager():
         'Cr': {'slope': 0.4627, 'intercept': -27.6859, 'r_squared': 0.9987, 'standards': ['Till 1', 'LKSD 1', 'PACS 2']}
     }
     
-    for element, data in test_calibrations.items():
-        cal_mgr.update_calibration(
-            element, data['slope'], data['intercept'], 
-            data['r_squared'], data['standards']
-        )
-        print(f"  ✓ Added calibration for {element}")
+    with cal_mgr.bulk_update():  # Save once after all updates
+        for element, data in test_calibrations.items():
+            cal_mgr.update_calibration(
+                element, data['slope'], data['intercept'], 
+                data['r_squared'], data['standards']
+            )
+            _emit(f"  ✓ Added calibration for {element}")
     
     # Test 2: Verify persistence
-    print("\n2. Testing calibration persistence...")
+    _emit("\n2. Testing calibration persistence...")
     cal_mgr2 = CalibrationManager(test_file)  # Load from file
     
     for element in test_calibrations.keys():
         if cal_mgr2.has_calibration(element):
             cal_data = cal_mgr2.get_calibration(element)
-            print(f"  ✓ {element}: {cal_data['equation']}")
+            _emit(f"  ✓ {element}: {cal_data['equation']}")
         else:
-            print(f"  ✗ {element}: Not found!")
+            _emit(f"  ✗ {element}: Not found!")
     
     # Test 3: Export/Import
-    print("\n3. Testing export/import...")
+    _emit("\n3. Testing export/import...")
     export_file = "test_export.json"
     
     if cal_mgr2.export_calibrations(export_file):
-        print(f"  ✓ Exported to {export_file}")
+        _emit(f"  ✓ Exported to {export_file}")
         
         # Test import
         cal_mgr3 = CalibrationManager("test_import.json")
         if cal_mgr3.import_calibrations(export_file):
-            print(f"  ✓ Imported from {export_file}")
-            print(f"  ✓ Imported {len(cal_mgr3.get_all_calibrations())} calibrations")
+            _emit(f"  ✓ Imported from {export_file}")
+            _emit(f"  ✓ Imported {len(cal_mgr3.get_all_calibrations())} calibrations")
         else:
-            print(f"  ✗ Import failed")
+            _emit(f"  ✗ Import failed")
     else:
-        print(f"  ✗ Export failed")
+        _emit(f"  ✗ Export failed")
     
     # Test 4: Calibration status
-    print("\n4. Testing calibration status...")
+    _emit("\n4. Testing calibration status...")
     all_cals = cal_mgr2.get_all_calibrations()
     
-    print(f"📊 Calibration Status Summary:")
-    print(f"   Total calibrations: {len(all_cals)}")
+    _emit(f"📊 Calibration Status Summary:")
+    _emit(f"   Total calibrations: {len(all_cals)}")
     
-    for element in ELEMENT_DEFINITIONS.keys():
-        if element in all_cals:
-            cal = all_cals[element]
-            print(f"   ✅ {element}: R²={cal.get('r_squared', 'N/A'):.4f}, Standards={len(cal.get('standards_used', []))}")
+    calibrated_line = "   ✅ {}: R²={:.4f}, Standards={}".format
+    default_line = "   ⚠️  {}: Using default (slope={:.4f})".format
+    for element, default_slope in zip(ELEM_ARR['symbol'].tolist(), ELEM_ARR['slope'].tolist()):
+        cal = all_cals.get(element)
+        if cal is not None:
+            _emit(calibrated_line(element, cal.get('r_squared', 'N/A'), len(cal.get('standards_used', []))))
         else:
-            default_cal = ELEMENT_DEFINITIONS[element]['default_calibration']
-            print(f"   ⚠️  {element}: Using default (slope={default_cal['slope']:.4f})")
+            _emit(default_line(element, default_slope))
     
     # Cleanup
-    for file in [test_file, export_file, "test_import.json"]:
-        if os.path.exists(file):
-            os.remove(file)
+    for file in (test_file, export_file, "test_import.json"):
+        Path(file).unlink(missing_ok=True)
     
-    print("\n✅ All calibration persistence tests passed!")
+    _emit("\n✅ All calibration persistence tests passed!")
 
 def test_calibration_file_format():
     """Test the calibration file format"""
@@ -100,11 +116,11 @@ def test_calibration_file_format():
     
     # Read and display file format
     if os.path.exists("format_test.json"):
-        with open("format_test.json", 'r') as f:
-            data = json.load(f)
+        with open("format_test.json", 'rb') as f:
+            data = _loads(f.read())
         
         print("Sample calibration file format:")
-        print(json.dumps(data, indent=2))
+        print(_dumps(data))
         
         # Verify required fields
         pb_cal = data.get('Pb', {})
@@ -123,7 +139,7 @@ def test_calibration_file_format():
 
 def main():
     """Run all calibration persistence tests"""
-    test_calibration_manager()
+    test_calibration_manager(verbose=True)
     test_calibration_file_format()
     
     print("\n" + "🎉" * 20)
@@ -1,10 +1,18 @@
 import sys
 import os
+import io
 import json
+import math
 import re
 import numpy as np
 import pandas as pd
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+from types import MappingProxyType
 
 # macOS compatibility fixes
 if sys.platform == 'darwin':
@@ -23,7 +31,7 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from scipy.optimize import curve_fit
-from scipy import integrate, stats
+from scipy import stats
 from PySide6.QtWidgets import *
 from PySide6.QtCore import *
 from PySide6.QtGui import *
@@ -46,6 +54,332 @@ except ImportError:
     HAS_XRAYLIB = False
     XRFFundamentalParameters = None
 
+# Try to import orjson (optional dependency) for faster calibration file I/O
+try:
+    import orjson
+    
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+    
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2).encode('utf-8')
+    
+    _loads = json.loads
+
+# Try to import numba (optional dependency) to compile the peak model, background and batch fitting loops
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Gaussian-A constants: sqrt(ln(2)/pi) * (a/dx) * exp(-ln(2) * (x-x0)^2 / dx^2)
+_LN2 = math.log(2)
+_GAUSS_A_COEFF = math.sqrt(_LN2 / math.pi)
+_GA_AREA_CONST = math.sqrt(math.pi / _LN2)  # amplitude * fwhm * this = Gaussian-A area
+
+if HAS_NUMBA:
+    # Gaussian shape 2**-s = exp(-ln(2) * s) for s = ((x-x0)/dx)^2: 2**-round(s) from a
+    # table times a degree-7 Taylor polynomial in the remainder (|f| <= 0.5, relative
+    # error < 1e-8). Beyond _GAUSS_CUTOFF FWHMs^2 the shape is below 6e-20 and taken as 0.
+    _GAUSS_CUTOFF = 64.0
+    _EXP2_NEG = 2.0 ** -np.arange(int(_GAUSS_CUTOFF) + 1)
+    _EXP2_POLY = tuple((-_LN2) ** k / math.factorial(k) for k in range(8))
+    
+    @njit(cache=True)
+    def _gauss_shape(s):
+        """2**-s for s >= 0 without calling exp (numba has no vector exp without SVML)"""
+        # Neither this nor its callers use fastmath: with no-NaN assumptions LLVM
+        # could fold both tests away and let a NaN s index the table
+        if s < _GAUSS_CUTOFF:
+            n = int(s + 0.5)
+            f = s - n
+            c = _EXP2_POLY
+            return _EXP2_NEG[n] * (c[0] + f * (c[1] + f * (c[2] + f * (c[3] + f * (c[4] + f * (c[5] + f * (c[6] + f * c[7])))))))
+        if s >= _GAUSS_CUTOFF:
+            return 0.0
+        return s
+    
+    @njit(cache=True)
+    def _gaussian_a_model(x, a, x0, dx, m, b, out):
+        """Write the Gaussian-A peak plus linear background m*x + b into out"""
+        inv = 1.0 / (dx * dx)
+        amp = _GAUSS_A_COEFF * a / dx
+        for i in range(x.size):
+            d = x[i] - x0
+            out[i] = amp * _gauss_shape(d * d * inv) + m * x[i] + b
+else:
+    def _gaussian_a_model(x, a, x0, dx, m, b, out):
+        """Write the Gaussian-A peak plus linear background m*x + b into out"""
+        # Every step works in place on out, so no temporaries are allocated
+        np.subtract(x, x0, out=out)
+        np.multiply(out, out, out=out)
+        out *= -_LN2 / (dx * dx)
+        np.exp(out, out=out)
+        out *= _GAUSS_A_COEFF * a / dx
+        if m:
+            out += m * x
+        if b:
+            out += b
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _gaussian_a_jac(x, a, x0, dx, out):
+        """Write d/d(a, x0, dx) of the Gaussian-A peak into out[:, :3] (and d/d(m, b) into out[:, 3:])"""
+        coeff = _GAUSS_A_COEFF / dx
+        for i in range(x.size):
+            u = (x[i] - x0) / dx
+            g = coeff * _gauss_shape(u * u)
+            peak = a * g
+            out[i, 0] = g
+            out[i, 1] = peak * 2 * _LN2 * u / dx
+            out[i, 2] = peak * (2 * _LN2 * u * u - 1) / dx
+            if out.shape[1] == 5:
+                out[i, 3] = x[i]
+                out[i, 4] = 1.0
+else:
+    def _gaussian_a_jac(x, a, x0, dx, out):
+        """Write d/d(a, x0, dx) of the Gaussian-A peak into out[:, :3] (and d/d(m, b) into out[:, 3:])"""
+        u = (x - x0) / dx
+        g = out[:, 0]
+        np.multiply(np.exp(-_LN2 * u * u), _GAUSS_A_COEFF / dx, out=g)  # d/da
+        peak = a * g
+        np.multiply(peak, 2 * _LN2 * u / dx, out=out[:, 1])  # d/dx0
+        np.multiply(peak, (2 * _LN2 * u * u - 1) / dx, out=out[:, 2])  # d/ddx
+        if out.shape[1] == 5:
+            out[:, 3] = x
+            out[:, 4] = 1.0
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _background_sums(x, y, lo, hi):
+        """Count and sums (x, y, x*x, x*y) over the points outside [lo, hi]"""
+        n = 0
+        sx = sy = sxx = sxy = 0.0
+        for i in range(x.size):
+            xi = x[i]
+            if xi < lo or xi > hi:
+                yi = y[i]
+                n += 1
+                sx += xi
+                sy += yi
+                sxx += xi * xi
+                sxy += xi * yi
+        return n, sx, sy, sxx, sxy
+else:
+    def _background_sums(x, y, lo, hi):
+        """Count and sums (x, y, x*x, x*y) over the points outside [lo, hi]"""
+        mask = (x < lo) | (x > hi)
+        x_bg = x[mask]
+        y_bg = y[mask]
+        return x_bg.size, x_bg.sum(), y_bg.sum(), x_bg @ x_bg, x_bg @ y_bg
+
+if HAS_NUMBA:
+    @njit(cache=True)
+    def _lm_cost_and_normal(x, y, p, jtj, jtr):
+        """Residual sum of squares at p; fills J^T J and J^T r for the combined model"""
+        a, x0, dx, m, b = p[0], p[1], p[2], p[3], p[4]
+        inv = _LN2 / (dx * dx)
+        inv_dx2 = 1.0 / (dx * dx)
+        amp = _GAUSS_A_COEFF / dx
+        jtj[:, :] = 0.0
+        jtr[:] = 0.0
+        jac = np.empty(5)
+        cost = 0.0
+        for i in range(x.size):
+            d = x[i] - x0
+            g = amp * _gauss_shape(d * d * inv_dx2)
+            peak = a * g
+            r = y[i] - (peak + m * x[i] + b)
+            cost += r * r
+            jac[0] = g
+            jac[1] = peak * 2.0 * inv * d
+            jac[2] = peak * (2.0 * inv * d * d - 1.0) / dx
+            jac[3] = x[i]
+            jac[4] = 1.0
+            for j in range(5):
+                jtr[j] += jac[j] * r
+                for k in range(j + 1):
+                    jtj[j, k] += jac[j] * jac[k]
+        for j in range(5):
+            for k in range(j):
+                jtj[k, j] = jtj[j, k]
+        return cost
+
+    @njit(cache=True)
+    def _solve_damped(jtj, jtr, lam, free, step):
+        """
+        Solve (J^T J + lam*diag(J^T J)) step = J^T r by Gaussian elimination,
+        holding the parameters with free[j] == False fixed (step[j] = 0)
+        """
+        n = jtr.size
+        aug = np.empty((n, n + 1))
+        for j in range(n):
+            for k in range(n):
+                aug[j, k] = jtj[j, k] if free[j] and free[k] else 0.0
+            if free[j]:
+                aug[j, j] += lam * max(jtj[j, j], 1e-12)
+                aug[j, n] = jtr[j]
+            else:
+                aug[j, j] = 1.0
+                aug[j, n] = 0.0
+        for c in range(n):
+            piv = c
+            for r in range(c + 1, n):
+                if abs(aug[r, c]) > abs(aug[piv, c]):
+                    piv = r
+            if abs(aug[piv, c]) < 1e-300:
+                return False
+            if piv != c:
+                for k in range(n + 1):
+                    aug[c, k], aug[piv, k] = aug[piv, k], aug[c, k]
+            for r in range(c + 1, n):
+                f = aug[r, c] / aug[c, c]
+                for k in range(c, n + 1):
+                    aug[r, k] -= f * aug[c, k]
+        for c in range(n - 1, -1, -1):
+            acc = aug[c, n]
+            for k in range(c + 1, n):
+                acc -= aug[c, k] * step[k]
+            step[c] = acc / aug[c, c]
+        return True
+
+    @njit(cache=True)
+    def _fit_batch(x, Y, P0, lower, upper, max_iter):
+        """Levenberg-Marquardt fit of the combined model to every row of Y (bounds by projection)"""
+        n_spec = Y.shape[0]
+        P = np.empty((n_spec, 5))
+        jtj = np.empty((5, 5))
+        jtr = np.empty(5)
+        step = np.empty(5)
+        trial = np.empty(5)
+        tjtj = np.empty((5, 5))
+        tjtr = np.empty(5)
+        free = np.empty(5, dtype=np.bool_)
+        for s in range(n_spec):
+            y = Y[s]
+            p = P0[s].copy()
+            for j in range(5):
+                p[j] = min(max(p[j], lower[j]), upper[j])
+            cost = _lm_cost_and_normal(x, y, p, jtj, jtr)
+            lam = 1e-3
+            for _ in range(max_iter):
+                # Parameters on a bound whose descent direction points outside stay fixed
+                for j in range(5):
+                    free[j] = not ((p[j] <= lower[j] and jtr[j] < 0.0) or
+                                   (p[j] >= upper[j] and jtr[j] > 0.0))
+                improved = False
+                while lam < 1e12:
+                    if _solve_damped(jtj, jtr, lam, free, step):
+                        for j in range(5):
+                            trial[j] = min(max(p[j] + step[j], lower[j]), upper[j])
+                        trial_cost = _lm_cost_and_normal(x, y, trial, tjtj, tjtr)
+                        if trial_cost < cost:
+                            improved = True
+                            break
+                    lam *= 10.0
+                if not improved:
+                    break
+                converged = cost - trial_cost <= 1e-12 * cost
+                p[:] = trial
+                jtj[:, :] = tjtj
+                jtr[:] = tjtr
+                cost = trial_cost
+                lam = max(lam / 10.0, 1e-12)
+                if converged:
+                    break
+            P[s] = p
+        return P
+
+def gaussian_a_model(x, a, x0, dx, m=0.0, b=0.0):
+    """
+    Evaluate the Gaussian-A peak plus an optional linear background
+    
+    Parameters:
+    x: array-like, energies
+    a, x0, dx: peak amplitude, center and FWHM
+    m, b: linear background slope and intercept
+    
+    Returns:
+    y: float64 array with the shape of x (a scalar for scalar x)
+    """
+    x = np.require(x, dtype=np.float64, requirements='C')
+    out = np.empty_like(x)
+    _gaussian_a_model(x.reshape(-1), float(a), float(x0), float(dx), float(m), float(b), out.reshape(-1))
+    return out if out.ndim else out[()]
+
+def gaussian_a_jacobian(x, a, x0, dx, background=False):
+    """
+    Partial derivatives of the Gaussian-A peak with respect to (a, x0, dx)
+    
+    With background=True two more columns hold the derivatives of the
+    linear background m*x + b with respect to (m, b).
+    
+    Returns:
+    jac: (len(x), 3) or (len(x), 5) float64 array, for curve_fit's jac argument
+    """
+    x = np.require(x, dtype=np.float64, requirements='C').reshape(-1)
+    jac = np.empty((x.size, 5 if background else 3))
+    _gaussian_a_jac(x, float(a), float(x0), float(dx), jac)
+    return jac
+
+def line_family_model(x, amp, energies, ratios, fwhm):
+    """
+    Sum of Gaussian-A lines sharing one FWHM, with areas amp * ratios
+    
+    All lines are evaluated in one broadcast (len(x), len(energies)) pass.
+    """
+    u = (np.asarray(x, dtype=np.float64)[:, None] - energies) / fwhm
+    return np.exp(-_LN2 * u * u) @ (ratios * (amp * _GAUSS_A_COEFF / fwhm))
+
+def line_family_jacobian(x, amp, energies, ratios, fwhm):
+    """Partial derivatives of line_family_model with respect to amp and fwhm"""
+    u = (np.asarray(x, dtype=np.float64)[:, None] - energies) / fwhm
+    shape = np.exp(-_LN2 * u * u)
+    weights = ratios * (_GAUSS_A_COEFF / fwhm)
+    d_amp = shape @ weights
+    d_fwhm = (shape * (2 * _LN2 * u * u - 1)) @ (weights * (amp / fwhm))
+    return d_amp, d_fwhm
+
+def is_ascending(x):
+    """True for a 1-D array in non-decreasing order"""
+    x = np.asarray(x)
+    return x.ndim == 1 and not np.any(x[1:] < x[:-1])
+
+def energy_window(x, region, ascending=None):
+    """
+    Index selecting the points of x inside region (inclusive)
+    
+    For an ascending energy axis this is a slice found with two binary
+    searches, so x[index] and y[index] are views; otherwise it falls back
+    to a boolean mask. Pass ascending when the order is already known to
+    skip the O(N) check.
+    """
+    x = np.asarray(x)
+    if ascending is None:
+        ascending = is_ascending(x)
+    if not ascending:
+        return (x >= region[0]) & (x <= region[1])
+    return slice(np.searchsorted(x, region[0], 'left'), np.searchsorted(x, region[1], 'right'))
+
+@lru_cache(maxsize=64)
+def peak_fit_bounds(lo, hi, background=True):
+    """
+    Read-only (lower, upper) curve_fit bounds for a Gaussian-A peak in [lo, hi]
+    
+    Parameters are [a, x0, dx, m, b] with background, [a, x0, dx] without.
+    Cached, so a batch fitting one peak region builds its bounds once.
+    """
+    lower = np.array([0, lo, 0.01, -np.inf, 0], dtype=np.float64)
+    upper = np.array([np.inf, hi, 1.0, np.inf, np.inf], dtype=np.float64)
+    if not background:
+        lower, upper = lower[:3].copy(), upper[:3].copy()
+    lower.flags.writeable = False
+    upper.flags.writeable = False
+    return lower, upper
+
 # Helper function for zero-intercept linear regression
 def zero_intercept_regression(x, y):
     """
@@ -59,25 +393,29 @@ def zero_intercept_regression(x, y):
     r_squared: float, coefficient of determination
     std_error: float, standard error of the slope
     """
-    x = np.array(x)
-    y = np.array(y)
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
     
-    # Calculate slope: slope = sum(x*y) / sum(x^2)
-    slope = np.sum(x * y) / np.sum(x * x)
+    # All statistics follow from these sums (each a single BLAS/reduction pass)
+    n = x.size
+    sxx = x @ x
+    sxy = x @ y
+    syy = y @ y
+    sy = y.sum()
     
-    # Calculate predicted values
-    y_pred = slope * x
+    # Calculate slope: slope = sum(x*y) / sum(x^2)
+    slope = sxy / sxx
     
-    # Calculate R-squared
-    ss_res = np.sum((y - y_pred) ** 2)  # Sum of squares of residuals
-    ss_tot = np.sum((y - np.mean(y)) ** 2)  # Total sum of squares
+    # Calculate R-squared; sum((y - slope*x)^2) and sum((y - mean(y))^2)
+    # expanded in terms of the sums (clamped against rounding below zero)
+    ss_res = max(syy - 2 * slope * sxy + slope * slope * sxx, 0.0)  # Sum of squares of residuals
+    ss_tot = max(syy - sy * sy / n, 0.0)  # Total sum of squares
     r_squared = 1 - (ss_res / ss_tot) if ss_tot != 0 else 0
     
     # Calculate standard error of slope
-    n = len(x)
     if n > 1:
         mse = ss_res / (n - 1)  # Mean squared error (adjusted for 1 parameter)
-        std_error = np.sqrt(mse / np.sum(x * x))
+        std_error = np.sqrt(mse / sxx)
     else:
         std_error = 0
     
@@ -89,13 +427,26 @@ class CalibrationManager:
     def __init__(self, calibration_file="xrf_calibrations.json"):
         self.calibration_file = calibration_file
         self.calibrations = self.load_calibrations()
+        self._readonly = MappingProxyType(self.calibrations)  # live read-only view
+        self._deferred = False
+        self._dirty = False  # True when calibrations differ from the file
+    
+    @contextmanager
+    def bulk_update(self):
+        """Defer saving while several calibrations are changed, then save once"""
+        self._deferred = True
+        try:
+            yield self
+        finally:
+            self._deferred = False
+            self._autosave()
     
     def load_calibrations(self):
         """Load calibrations from file"""
         if os.path.exists(self.calibration_file):
             try:
-                with open(self.calibration_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.calibration_file, 'rb') as f:
+                    data = _loads(f.read())
                 print(f"Loaded calibrations from {self.calibration_file}")
                 return data
             except Exception as e:
@@ -104,14 +455,29 @@ class CalibrationManager:
         return {}
     
     def save_calibrations(self):
-        """Save calibrations to file"""
+        """
+        Save calibrations to file
+        
+        Always writes, even if nothing changed through this manager (e.g. the
+        file was removed, or a dict from get_calibration was edited). The file
+        is written to a temporary sibling and moved into place, so an
+        interrupted save never leaves a truncated calibration file.
+        """
+        tmp_file = self.calibration_file + '.tmp'
         try:
-            with open(self.calibration_file, 'w') as f:
-                json.dump(self.calibrations, f, indent=2)
+            with open(tmp_file, 'wb') as f:
+                f.write(_dumps(self.calibrations))
+            os.replace(tmp_file, self.calibration_file)
+            self._dirty = False
             print(f"Saved calibrations to {self.calibration_file}")
         except Exception as e:
             print(f"Error saving calibrations: {e}")
     
+    def _autosave(self):
+        """Save after a change, unless nothing changed or saving is deferred inside bulk_update"""
+        if self._dirty and not self._deferred:
+            self.save_calibrations()
+    
     def update_calibration(self, element, slope, intercept, r_squared=None, standards_used=None, raw_intensities=None, raw_standards=None):
         """Update calibration for an element"""
         if element not in self.calibrations:
@@ -128,7 +494,8 @@ class CalibrationManager:
             'raw_standards': raw_standards if raw_standards else []  # List of standards for each measurement
         })
         
-        self.save_calibrations()
+        self._dirty = True
+        self._autosave()
         print(f"Updated calibration for {element}")
     
     def get_calibration(self, element):
@@ -140,21 +507,28 @@ class CalibrationManager:
         return element in self.calibrations
     
     def get_all_calibrations(self):
-        """Get all calibrations"""
-        return self.calibrations.copy()
+        """Get all calibrations as a read-only view (use dict() for a mutable copy)"""
+        return self._readonly
     
     def delete_calibration(self, element):
         """Delete calibration for an element"""
         if element in self.calibrations:
             del self.calibrations[element]
-            self.save_calibrations()
+            self._dirty = True
+            self._autosave()
             print(f"Deleted calibration for {element}")
     
+    def clear_calibrations(self):
+        """Delete all calibrations"""
+        self.calibrations.clear()
+        self._dirty = True
+        self._autosave()
+    
     def export_calibrations(self, filename):
         """Export calibrations to a file"""
         try:
-            with open(filename, 'w') as f:
-                json.dump(self.calibrations, f, indent=2)
+            with open(filename, 'wb') as f:
+                f.write(_dumps(self.calibrations))
             return True
         except Exception as e:
             print(f"Error exporting calibrations: {e}")
@@ -163,10 +537,11 @@ class CalibrationManager:
     def import_calibrations(self, filename):
         """Import calibrations from a file"""
         try:
-            with open(filename, 'r') as f:
-                imported = json.load(f)
+            with open(filename, 'rb') as f:
+                imported = _loads(f.read())
             self.calibrations.update(imported)
-            self.save_calibrations()
+            self._dirty = True
+            self._autosave()
             return True
         except Exception as e:
             print(f"Error importing calibrations: {e}")
@@ -282,6 +657,23 @@ ELEMENT_DEFINITIONS = {
     }
 }
 
+# Element definitions as a structured array for fast field access,
+# with ELEM_IDX mapping each symbol to its row. Alternative peak regions
+# are NaN for elements without an alternative peak.
+ELEM_DTYPE = np.dtype([('symbol', 'U4'), ('name', 'U32'), ('energy', 'f8'),
+                       ('slope', 'f8'), ('intercept', 'f8'),
+                       ('peak_region', 'f8', (2,)), ('integration_region', 'f8', (2,)),
+                       ('alt_peak_region', 'f8', (2,)), ('alt_integration_region', 'f8', (2,))])
+_NO_REGION = (np.nan, np.nan)
+ELEM_ARR = np.array([(symbol, data['name'], data['primary_energy'],
+                      data['default_calibration']['slope'], data['default_calibration']['intercept'],
+                      data['peak_region'], data['integration_region'],
+                      data.get('alternative_peak', {}).get('peak_region', _NO_REGION),
+                      data.get('alternative_peak', {}).get('integration_region', _NO_REGION))
+                     for symbol, data in ELEMENT_DEFINITIONS.items()], dtype=ELEM_DTYPE)
+ELEM_ARR.setflags(write=False)
+ELEM_IDX = {symbol: i for i, symbol in enumerate(ELEMENT_DEFINITIONS)}
+
 # Peak interference definitions
 # Format: {element: [list of elements that interfere with it]}
 PEAK_INTERFERENCES = {
@@ -386,23 +778,189 @@ REFERENCE_MATERIALS = {
     }
 }
 
+def parse_reference_column(values):
+    """
+    Convert reference values to ppm in a single vectorized pass
+    
+    The values are classified with NumPy string operations (no per-value
+    branching): "<" marks a below-detection-limit value and a trailing "%"
+    a percentage.
+    
+    Parameters:
+    values: array-like, raw values (numbers, "x%", "<x%", "N/A" or None)
+    
+    Returns:
+    ppm: float Series; percent values scaled to ppm, NaN where missing,
+         unparseable or below the detection limit ("<")
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    text = np.char.strip(np.asarray([str(value) for value in values], dtype=str))
+    below_limit = np.char.find(text, '<') >= 0
+    percent = np.char.endswith(text, '%')
+    conc = pd.to_numeric(np.char.rstrip(text, '%'), errors='coerce').astype(float)
+    conc = np.where(percent, conc * 10000, conc)  # Convert % to ppm
+    conc = np.where(below_limit, np.nan, conc)
+    return pd.Series(conc, index=index)
+
+def build_reference_ppm_table(materials=REFERENCE_MATERIALS):
+    """
+    Convert reference material concentrations to a numeric table in ppm
+    
+    Parameters:
+    materials: dict, reference materials as {material: {element: value}}
+    
+    Returns:
+    table: DataFrame indexed by material with one float column per element.
+           Percent values are converted to ppm; missing, "N/A" and
+           below-detection-limit ("<") values are NaN.
+    """
+    raw = pd.DataFrame.from_dict(materials, orient='index')
+    
+    # Parse the whole grid in one pass, then restore its shape
+    ppm = parse_reference_column(raw.to_numpy(dtype=object).ravel()).to_numpy()
+    return pd.DataFrame(ppm.reshape(raw.shape), index=raw.index, columns=raw.columns)
+
+# Reference concentrations (ppm) parsed once at import: REF_CONC[i, j] is material
+# REF_MATERIAL_NAMES[i] and element j in ELEMENT_DEFINITIONS order (see ELEM_IDX);
+# REF_VALID marks the entries with a usable value
+_ref_ppm = build_reference_ppm_table(REFERENCE_MATERIALS).reindex(columns=list(ELEMENT_DEFINITIONS))
+REF_MATERIAL_NAMES = _ref_ppm.index.tolist()
+REF_CONC = _ref_ppm.to_numpy(dtype=float)
+REF_VALID = ~np.isnan(REF_CONC)
+REF_MATERIAL_INDEX = {name: i for i, name in enumerate(REF_MATERIAL_NAMES)}
+
+# REF_FLAGS classifies every entry: 0 = value, 1 = below detection limit, 2 = missing
+_ref_text = np.char.strip(np.asarray(
+    [[str(material.get(element)) for element in ELEMENT_DEFINITIONS]
+     for material in REFERENCE_MATERIALS.values()], dtype=str))
+_ref_flags = np.where(REF_VALID, 0, np.where(np.char.find(_ref_text, '<') >= 0, 1, 2)).astype(np.uint8)
+for _arr in (REF_CONC, REF_VALID, _ref_flags):
+    _arr.setflags(write=False)
+
+# Per-element read-only column views, e.g. REF_VALUES_PPM['Pb'][REF_FLAGS['Pb'] == 0]
+REF_VALUES_PPM = {element: REF_CONC[:, j] for j, element in enumerate(ELEMENT_DEFINITIONS)}
+REF_FLAGS = {element: _ref_flags[:, j] for j, element in enumerate(ELEMENT_DEFINITIONS)}
+del _ref_ppm, _ref_text, _ref_flags, _arr
+
+def reference_concentration(material, element):
+    """Certified concentration (ppm) of element in a built-in reference material, or None"""
+    i = REF_MATERIAL_INDEX.get(material)
+    if i is None or element not in REF_FLAGS or REF_FLAGS[element][i]:
+        return None
+    return float(REF_VALUES_PPM[element][i])
+
+def reference_standards(element):
+    """
+    Built-in reference materials with a usable certified value for an element
+    
+    Returns:
+    names: list of material names
+    concentrations: list of concentrations (ppm) in the same order
+    """
+    if element not in REF_FLAGS:
+        return [], []
+    valid = REF_FLAGS[element] == 0
+    names = [name for name, ok in zip(REF_MATERIAL_NAMES, valid) if ok]
+    return names, REF_VALUES_PPM[element][valid].tolist()
+
+def read_xrf_file(file_path):
+    """
+    Read XRF data from file using smart format detection
+    
+    Parameters:
+    file_path: str, path to the XRF data file
+    
+    Returns:
+    (x, y) arrays of energy (keV) and intensity, or None if parsing failed
+    """
+    try:
+        # Use the smart parser that automatically detects file format
+        x, y, format_type = parse_xrf_file_smart(file_path)
+        
+        if x is not None and y is not None:
+            print(f"Successfully parsed {os.path.basename(file_path)} as {format_type} format")
+            return x, y
+        else:
+            print(f"Failed to parse {file_path} with smart parser")
+            return None
+            
+    except Exception as e:
+        print(f"Error reading {file_path}: {e}")
+        return None
+
+def compact_spectrum(x, y):
+    """
+    float32 copies of a spectrum for keeping alongside batch results
+    
+    Counts are integers well below 2**24 and energies need ~1e-6 relative
+    precision, so float32 loses nothing that matters for display or
+    refitting; the fits themselves still run in float64.
+    """
+    return np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32)
+
+# File naming patterns recognised by detect_sorting_pattern, in priority order
+_SORT_PATTERNS = [(name, re.compile(pattern)) for name, pattern in (
+    ("sample_number", r"sample_(\d+)"),
+    ("sample_number_extended", r"sample_(\d+)_"),
+    ("number_only", r"^(\d+)"),
+    ("letter_number", r"([A-Za-z]+)(\d+)"),
+    ("date_pattern", r"(\d{4})[-_](\d{2})[-_](\d{2})"),
+    ("time_pattern", r"(\d{2})[-:](\d{2})[-:](\d{2})"),
+)]
+_NUM_SPLIT = re.compile(r'([0-9]+)')
+# Number of filenames inspected to detect the naming pattern of a folder
+_PATTERN_SAMPLE_SIZE = 32
+
+# Sorts text runs after any number in the same position
+_TEXT_RANK = 10 ** 18
+
+def natural_sort_key(filename):
+    """Generate a key for natural sorting of filenames (numbers compare numerically)"""
+    # Split the base filename into text and number parts; every part becomes an
+    # (int, str) pair so the key is compared as uniformly typed tuples
+    basename = os.path.basename(filename)
+    return tuple((int(part), '') if part.isdigit() else (_TEXT_RANK, part.lower())
+                 for part in _NUM_SPLIT.split(basename) if part)
+
+def smart_sort_files(file_paths):
+    """Sort files using natural sorting (handles numbers correctly)"""
+    return sorted(file_paths, key=natural_sort_key)
+
+def detect_sorting_pattern(file_paths):
+    """Detect the naming pattern shared by the files (judged from the first few)"""
+    if not file_paths:
+        return "unknown"
+    
+    # Folder naming is homogeneous in practice, so the first files decide
+    filenames = [os.path.basename(f) for f in file_paths[:_PATTERN_SAMPLE_SIZE]]
+    
+    # First pattern matching every sampled file wins; each check stops at the first miss
+    for pattern_name, pattern in _SORT_PATTERNS:
+        if all(pattern.search(f) is not None for f in filenames):
+            return pattern_name
+    
+    return "unknown"
+
 # Load XRF lines database for element identification
 def load_xrf_lines_database():
     """Load XRF characteristic lines from CSV file"""
     csv_path = os.path.join(os.path.dirname(__file__), 'data', 'xrf_lines_Na_to_U.csv')
     try:
-        df = pd.read_csv(csv_path)
-        # Group by element for easy lookup
+        df = pd.read_csv(csv_path, engine='c')
+        # Group by element for easy lookup (one pass over the rows, elements
+        # kept in file order)
         xrf_lines_db = {}
-        for element in df['Element'].unique():
-            element_lines = df[df['Element'] == element]
-            xrf_lines_db[element] = element_lines.to_dict('records')
+        for record in df.to_dict('records'):
+            xrf_lines_db.setdefault(record['Element'], []).append(record)
         return xrf_lines_db, df
     except Exception as e:
         print(f"Warning: Could not load XRF lines database: {e}")
         return {}, pd.DataFrame()
 
-XRF_LINES_DB, XRF_LINES_DF = load_xrf_lines_database()
+@lru_cache(maxsize=None)
+def xrf_lines_db():
+    """XRF lines database as (lines grouped by element, DataFrame), loaded on first use"""
+    return load_xrf_lines_database()
 
 # Import matplotlib configuration
 try:
@@ -413,8 +971,7 @@ try:
         apply_theme,
         get_toolbar_class
     )
-    # Apply compact configuration
-    configure_compact_ui()
+    # matplotlib_config applies the compact configuration when it is imported
 except ImportError:
     print("Warning: matplotlib_config.py not found, using default matplotlib settings")
     CompactNavigationToolbar = None
@@ -429,6 +986,10 @@ class FileSortingDialog(QDialog):
         self.file_paths = file_paths
         self.folder_path = folder_path
         self.sorted_files = []
+        self._file_stats = None  # path -> os.stat_result, filled on first use
+        self._columns_sized = False
+        # Lower-cased extension of each file, parallel to file_paths
+        self._file_exts = [os.path.splitext(path)[1].lower() for path in file_paths]
         
         self.setWindowTitle("File Sorting Options")
         self.setGeometry(300, 200, 800, 600)
@@ -454,15 +1015,8 @@ class FileSortingDialog(QDialog):
         self.extension_checkboxes = {}
         common_extensions = ['.txt', '.csv', '.xlsx', '.dat', '.emsa', '.spc']
         
-        # Get all unique extensions from the files
-        all_extensions = set()
-        for file_path in self.file_paths:
-            ext = os.path.splitext(file_path)[1].lower()
-            if ext:
-                all_extensions.add(ext)
-        
-        # Sort extensions for consistent display
-        all_extensions = sorted(all_extensions)
+        # Get all unique extensions from the files, sorted for consistent display
+        all_extensions = sorted(set(self._file_exts).difference(('',)))
         
         # Create checkboxes for each extension
         ext_layout = QHBoxLayout()
@@ -559,11 +1113,28 @@ class FileSortingDialog(QDialog):
         """Load and display files"""
         self.update_preview()
     
+    def file_stats(self):
+        """Stat results for the dialog's files, collected once with a single folder scan"""
+        if self._file_stats is None:
+            wanted = set(self.file_paths)
+            stats = {}
+            try:
+                with os.scandir(self.folder_path) as entries:
+                    for entry in entries:
+                        if entry.path in wanted:
+                            stats[entry.path] = entry.stat()
+            except OSError:
+                pass
+            for path in wanted.difference(stats):
+                stats[path] = os.stat(path)
+            self._file_stats = stats
+        return self._file_stats
+    
     def update_preview(self):
         """Update the file preview based on selected sorting method and extension filter"""
         # First filter by selected extensions
-        selected_extensions = [ext for ext, checkbox in self.extension_checkboxes.items() 
-                             if checkbox.isChecked()]
+        selected_extensions = frozenset(ext for ext, checkbox in self.extension_checkboxes.items()
+                                        if checkbox.isChecked())
         
         if not selected_extensions:
             # If no extensions selected, show no files
@@ -573,8 +1144,8 @@ class FileSortingDialog(QDialog):
             return
         
         # Filter files by selected extensions
-        filtered_files = [f for f in self.file_paths 
-                         if os.path.splitext(f)[1].lower() in selected_extensions]
+        filtered_files = [f for f, ext in zip(self.file_paths, self._file_exts)
+                          if ext in selected_extensions]
         
         if not filtered_files:
             self.sorted_files = []
@@ -593,10 +1164,12 @@ class FileSortingDialog(QDialog):
             self.sorted_files = sorted(filtered_files)
             self.pattern_label.setText("Detected Pattern: Alphabetical")
         elif method == "Date Modified":
-            self.sorted_files = sorted(filtered_files, key=lambda x: os.path.getmtime(x))
+            stats = self.file_stats()
+            self.sorted_files = sorted(filtered_files, key=lambda x: stats[x].st_mtime)
             self.pattern_label.setText("Detected Pattern: Date Modified")
         elif method == "File Size":
-            self.sorted_files = sorted(filtered_files, key=lambda x: os.path.getsize(x))
+            stats = self.file_stats()
+            self.sorted_files = sorted(filtered_files, key=lambda x: stats[x].st_size)
             self.pattern_label.setText("Detected Pattern: File Size")
         elif method == "Custom Order":
             # For custom order, we'll keep the original order but allow manual reordering
@@ -605,63 +1178,43 @@ class FileSortingDialog(QDialog):
         
         self.display_files()
     
-    def smart_sort_files(self, file_paths):
-        """Sort files using natural sorting (handles numbers correctly)"""
-        def natural_sort_key(filename):
-            basename = os.path.basename(filename)
-            def convert(text):
-                return int(text) if text.isdigit() else text.lower()
-            return [convert(c) for c in re.split('([0-9]+)', basename)]
-        
-        return sorted(file_paths, key=natural_sort_key)
-    
-    def detect_sorting_pattern(self, file_paths):
-        """Detect the naming pattern in the files"""
-        if not file_paths:
-            return "unknown"
-        
-        filenames = [os.path.basename(f) for f in file_paths]
-        
-        patterns = {
-            "sample_number": r"sample_(\d+)",
-            "sample_number_extended": r"sample_(\d+)_",
-            "number_only": r"^(\d+)",
-            "letter_number": r"([A-Za-z]+)(\d+)",
-            "date_pattern": r"(\d{4})[-_](\d{2})[-_](\d{2})",
-            "time_pattern": r"(\d{2})[-:](\d{2})[-:](\d{2})"
-        }
-        
-        for pattern_name, pattern in patterns.items():
-            matches = [re.search(pattern, f) for f in filenames]
-            if all(matches):
-                return pattern_name
-        
-        return "unknown"
+    smart_sort_files = staticmethod(smart_sort_files)
+    
+    detect_sorting_pattern = staticmethod(detect_sorting_pattern)
     
     def display_files(self):
         """Display files in the table"""
-        self.file_list.setRowCount(len(self.sorted_files))
-        
-        for i, file_path in enumerate(self.sorted_files):
-            # Order number
-            order_item = QTableWidgetItem(str(i + 1))
-            order_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.file_list.setItem(i, 0, order_item)
-            
-            # Filename
-            filename_item = QTableWidgetItem(os.path.basename(file_path))
-            self.file_list.setItem(i, 1, filename_item)
+        # Fill the table with repaints and item signals suspended
+        self.file_list.setUpdatesEnabled(False)
+        self.file_list.blockSignals(True)
+        try:
+            self.file_list.setRowCount(len(self.sorted_files))
             
-            # Full path
-            path_item = QTableWidgetItem(file_path)
-            path_item.setToolTip(file_path)
-            self.file_list.setItem(i, 2, path_item)
+            for i, file_path in enumerate(self.sorted_files):
+                # Order number
+                order_item = QTableWidgetItem(str(i + 1))
+                order_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.file_list.setItem(i, 0, order_item)
+                
+                # Filename
+                filename_item = QTableWidgetItem(os.path.basename(file_path))
+                self.file_list.setItem(i, 1, filename_item)
+                
+                # Full path
+                path_item = QTableWidgetItem(file_path)
+                path_item.setToolTip(file_path)
+                self.file_list.setItem(i, 2, path_item)
+        finally:
+            self.file_list.blockSignals(False)
+            self.file_list.setUpdatesEnabled(True)
         
         # Update info
         self.preview_info.setText(f"Showing {len(self.sorted_files)} files in {self.sort_method_combo.currentText()} order")
         
-        # Resize columns
-        self.file_list.resizeColumnsToContents()
+        # Size the columns once, the first time files are shown
+        if self.sorted_files and not self._columns_sized:
+            self.file_list.resizeColumnsToContents()
+            self._columns_sized = True
     
     def get_sorted_files(self):
         """Return the sorted file list"""
@@ -687,14 +1240,24 @@ class FileSortingDialog(QDialog):
 class XRFPeakFitter:
     """Core class for XRF peak fitting with background subtraction and Gaussian-A fitting"""
     
+    # curve_fit convergence tolerances; tighten on an instance for reference-grade fits
+    fit_xtol = 1e-5
+    fit_ftol = 1e-5
+    fit_gtol = 1e-8
+    
+    # Optimiser for the peak-only fit (background_subtract=False): 'lm' fits
+    # unbounded and refits with bounded 'trf' only if the result leaves the bounds
+    peak_fit_method = 'lm'
+    
     def __init__(self, element='Pb'):
         self.current_element = element
         self.element_data = ELEMENT_DEFINITIONS.get(element, ELEMENT_DEFINITIONS['Pb'])
+        row = ELEM_ARR[ELEM_IDX.get(element, ELEM_IDX['Pb'])]
         
-        self.target_energy = self.element_data['primary_energy']
+        self.target_energy = float(row['energy'])
         # Calibration parameters
-        self.calibration_slope = self.element_data['default_calibration']['slope']
-        self.calibration_intercept = self.element_data['default_calibration']['intercept']
+        self.calibration_slope = float(row['slope'])
+        self.calibration_intercept = float(row['intercept'])
         # Custom calibration name
         self.calibration_name = f"{element} Default Calibration"
         
@@ -706,18 +1269,20 @@ class XRFPeakFitter:
     
     def set_element(self, element):
         """Switch to a different element"""
-        if element in ELEMENT_DEFINITIONS:
+        i = ELEM_IDX.get(element)
+        if i is not None:
+            row = ELEM_ARR[i]
             self.current_element = element
             self.element_data = ELEMENT_DEFINITIONS[element]
-            self.target_energy = self.element_data['primary_energy']
+            self.target_energy = float(row['energy'])
             
             # Load calibration for this element
             if element in self.element_calibrations:
                 self.calibration_slope = self.element_calibrations[element]['slope']
                 self.calibration_intercept = self.element_calibrations[element]['intercept']
             else:
-                self.calibration_slope = self.element_data['default_calibration']['slope']
-                self.calibration_intercept = self.element_data['default_calibration']['intercept']
+                self.calibration_slope = float(row['slope'])
+                self.calibration_intercept = float(row['intercept'])
                 self.element_calibrations[element] = {'slope': self.calibration_slope, 'intercept': self.calibration_intercept}
             
             self.calibration_name = f"{element} Calibration"
@@ -738,18 +1303,22 @@ class XRFPeakFitter:
         if element is None:
             element = self.current_element
         
-        if element not in ELEMENT_DEFINITIONS:
+        i = ELEM_IDX.get(element)
+        if i is None:
             return None, None
         
-        element_data = ELEMENT_DEFINITIONS[element]
+        row = ELEM_ARR[i]
         use_alt = self.use_alternative_peak.get(element, False)
         
-        if use_alt and 'alternative_peak' in element_data:
-            alt_peak = element_data['alternative_peak']
-            return alt_peak['peak_region'], alt_peak['integration_region']
+        if use_alt and not np.isnan(row['alt_peak_region'][0]):
+            return tuple(row['alt_peak_region'].tolist()), tuple(row['alt_integration_region'].tolist())
         else:
-            return element_data['peak_region'], element_data['integration_region']
+            return tuple(row['peak_region'].tolist()), tuple(row['integration_region'].tolist())
         
+    def region_index(self, x, region):
+        """energy_window for the fitter's energy axis"""
+        return energy_window(x, region)
+    
     def gaussian_a(self, x, a, x0, dx):
         """
         Gaussian-A function with the specified equation:
@@ -760,37 +1329,61 @@ class XRFPeakFitter:
         - x0: peak center
         - dx: full width at half maximum (FWHM)
         """
-        ln2 = np.log(2)
-        coefficient = np.sqrt(ln2 / np.pi)
-        amplitude = a / dx
-        exponent = -ln2 * ((x - x0) ** 2) / (dx ** 2)
-        return coefficient * amplitude * np.exp(exponent)
+        return gaussian_a_model(x, a, x0, dx)
     
     def linear_background(self, x, m, b):
         """Linear background function"""
         return m * x + b
     
+    def curve_fit_options(self):
+        """
+        Keyword arguments shared by the curve_fit calls
+        
+        Inputs are checked for NaN/inf once by the caller, so curve_fit's own
+        check_finite pass is skipped.
+        """
+        return {'check_finite': False, 'xtol': self.fit_xtol,
+                'ftol': self.fit_ftol, 'gtol': self.fit_gtol}
+    
+    def gaussian_a_jac(self, x, a, x0, dx):
+        """Analytic Jacobian of gaussian_a with respect to (a, x0, dx)"""
+        return gaussian_a_jacobian(x, a, x0, dx)
+    
     def combined_model(self, x, a, x0, dx, m, b):
         """Combined peak + background model"""
-        return self.gaussian_a(x, a, x0, dx) + self.linear_background(x, m, b)
+        return gaussian_a_model(x, a, x0, dx, m, b)
+    
+    def combined_model_jac(self, x, a, x0, dx, m, b):
+        """Analytic Jacobian of combined_model with respect to (a, x0, dx, m, b)"""
+        return gaussian_a_jacobian(x, a, x0, dx, background=True)
     
     def estimate_background(self, x, y, peak_region):
         """Estimate linear background excluding peak region"""
-        mask = ~((x >= peak_region[0]) & (x <= peak_region[1]))
-        x_bg = x[mask]
-        y_bg = y[mask]
+        x = np.require(x, dtype=np.float64, requirements='C')
+        y = np.require(y, dtype=np.float64, requirements='C')
         
-        if len(x_bg) < 2:
+        # One pass over the points outside the peak region, no mask or copies
+        n, sx, sy, sxx, sxy = _background_sums(x, y, float(peak_region[0]), float(peak_region[1]))
+        if n < 2:
             return 0, np.mean(y)
         
-        # Linear fit to background points
-        p = np.polyfit(x_bg, y_bg, 1)
-        return p[0], p[1]
+        # Closed-form least squares line through the background points
+        denom = n * sxx - sx * sx
+        if denom == 0:
+            return 0.0, sy / n
+        slope = (n * sxy - sx * sy) / denom
+        intercept = (sy - slope * sx) / n
+        return slope, intercept
     
     def calculate_integrated_intensity(self, x, y, fit_params, peak_region):
         """
         Calculate integrated intensity of the peak after background subtraction
         
+        This trapezoid integral of the measured counts minus the fitted linear
+        background is the quantity every calibration (including the NIST
+        default slope) was fitted against; peak_window_area gives the area of
+        the fitted peak model instead.
+        
         Parameters:
         - x: energy array
         - y: intensity array
@@ -801,22 +1394,38 @@ class XRFPeakFitter:
         - integrated_intensity: background-corrected integrated peak area
         """
         # Select integration region
-        mask = (x >= peak_region[0]) & (x <= peak_region[1])
-        x_int = x[mask]
-        y_int = y[mask]
+        index = self.region_index(x, peak_region)
+        x_int = np.asarray(x[index], dtype=np.float64)
+        y_int = np.asarray(y[index], dtype=np.float64)
+        if x_int.size < 2:
+            return 0.0
         
-        # Calculate background in integration region
-        background = self.linear_background(x_int, 
-                                          fit_params['background_slope'], 
-                                          fit_params['background_intercept'])
+        # Integrate the counts using the trapezoidal rule
+        counts = 0.5 * (np.diff(x_int) @ (y_int[1:] + y_int[:-1]))
         
-        # Background-corrected intensity
-        y_corrected = y_int - background
+        # The trapezoidal rule is exact for the linear background, so its
+        # integral is subtracted in closed form
+        x_first, x_last = x_int[0], x_int[-1]
+        background = (0.5 * fit_params['background_slope'] * (x_last * x_last - x_first * x_first)
+                      + fit_params['background_intercept'] * (x_last - x_first))
         
-        # Integrate using trapezoidal rule
-        integrated_intensity = integrate.trapz(y_corrected, x_int)
+        return counts - background
+    
+    def peak_window_area(self, fit_params, peak_region):
+        """
+        Area of the fitted Gaussian-A peak (background excluded) inside peak_region
         
-        return integrated_intensity
+        Not interchangeable with calculate_integrated_intensity: calibrations
+        are built on the trapezoid intensity of the data.
+        """
+        # The model integrates to 'amplitude' over all energies and
+        # exp(-ln2*((x - x0)/dx)**2) has sigma = dx/sqrt(2*ln2), so the
+        # window area is two erf evaluations
+        a = fit_params['amplitude']
+        x0 = fit_params['center']
+        scale = math.sqrt(_LN2) / fit_params['fwhm']
+        lo, hi = peak_region
+        return 0.5 * a * (math.erf((hi - x0) * scale) - math.erf((lo - x0) * scale))
     
     def apply_calibration(self, integrated_intensity):
         """
@@ -833,7 +1442,7 @@ class XRFPeakFitter:
         concentration = self.calibration_slope * integrated_intensity + self.calibration_intercept
         return concentration
     
-    def fit_peak(self, x, y, peak_region=None, background_subtract=True, integration_region=None):
+    def fit_peak(self, x, y, peak_region=None, background_subtract=True, integration_region=None, p0=None):
         """
         Fit Gaussian-A peak with optional background subtraction and calculate integrated intensity
         
@@ -843,6 +1452,8 @@ class XRFPeakFitter:
         - peak_region: tuple (min_energy, max_energy) for fitting region
         - background_subtract: whether to include background in fit
         - integration_region: tuple (min_energy, max_energy) for integration
+        - p0: optional starting (amplitude, center, fwhm), e.g. from a replicate's fit;
+          the background start is always estimated from the data
         
         Returns:
         - fit_params: dictionary with fit parameters
@@ -861,20 +1472,28 @@ class XRFPeakFitter:
             _, integration_region = self.get_peak_regions()
         
         # Select fitting region
-        mask = (x >= peak_region[0]) & (x <= peak_region[1])
-        x_fit = x[mask]
-        y_fit = y[mask]
+        index = self.region_index(x, peak_region)
+        x_fit = x[index]
+        y_fit = y[index]
         
         if len(x_fit) < 5:
             raise ValueError("Insufficient data points in fitting region")
         
         # Initial parameter estimation
-        peak_idx = np.argmax(y_fit)
-        x0_init = x_fit[peak_idx]
-        a_init = np.max(y_fit)
-        dx_init = 0.1  # Initial FWHM estimate
+        if p0 is None:
+            peak_idx = np.argmax(y_fit)
+            x0_init = x_fit[peak_idx]
+            a_init = np.max(y_fit)
+            dx_init = 0.1  # Initial FWHM estimate
+        else:
+            # Warm start, kept inside the bounds
+            lower, upper = peak_fit_bounds(float(peak_region[0]), float(peak_region[1]), background=False)
+            a_init, x0_init, dx_init = np.clip(p0, lower, upper)
         
         try:
+            if not (np.isfinite(x_fit).all() and np.isfinite(y_fit).all()):
+                raise ValueError("Fitting region contains NaN or infinite values")
+            
             if background_subtract:
                 # Estimate background
                 m_init, b_init = self.estimate_background(x_fit, y_fit, peak_region)
@@ -883,11 +1502,11 @@ class XRFPeakFitter:
                 p0 = [a_init, x0_init, dx_init, m_init, b_init]
                 
                 # Bounds for parameters [a, x0, dx, m, b]
-                bounds = ([0, peak_region[0], 0.01, -np.inf, 0],
-                         [np.inf, peak_region[1], 1.0, np.inf, np.inf])
+                bounds = peak_fit_bounds(float(peak_region[0]), float(peak_region[1]))
                 
                 # Fit combined model
-                popt, pcov = curve_fit(self.combined_model, x_fit, y_fit, p0=p0, bounds=bounds)
+                popt, pcov = curve_fit(self.combined_model, x_fit, y_fit, p0=p0, bounds=bounds,
+                                       jac=self.combined_model_jac, **self.curve_fit_options())
                 
                 # Calculate fitted curve
                 fit_curve = self.combined_model(x_fit, *popt)
@@ -899,7 +1518,7 @@ class XRFPeakFitter:
                     'fwhm': popt[2],
                     'background_slope': popt[3],
                     'background_intercept': popt[4],
-                    'actual_peak_area': popt[0] * popt[2] * np.sqrt(np.pi / np.log(2)),  # Proper Gaussian-A area
+                    'actual_peak_area': popt[0] * popt[2] * _GA_AREA_CONST,  # Proper Gaussian-A area
                     'amplitude_error': np.sqrt(pcov[0,0]),
                     'center_error': np.sqrt(pcov[1,1]),
                     'fwhm_error': np.sqrt(pcov[2,2])
@@ -914,11 +1533,21 @@ class XRFPeakFitter:
                 p0 = [a_init, x0_init, dx_init]
                 
                 # Bounds for parameters [a, x0, dx]
-                bounds = ([0, peak_region[0], 0.01],
-                         [np.inf, peak_region[1], 1.0])
+                bounds = peak_fit_bounds(float(peak_region[0]), float(peak_region[1]), background=False)
                 
-                # Fit peak only
-                popt, pcov = curve_fit(self.gaussian_a, x_fit, y_bg_sub, p0=p0, bounds=bounds)
+                # Fit peak only; the bounds rarely bind, so try unbounded Levenberg-Marquardt first
+                popt = None
+                if self.peak_fit_method == 'lm':
+                    try:
+                        popt, pcov = curve_fit(self.gaussian_a, x_fit, y_bg_sub, p0=p0, method='lm',
+                                               jac=self.gaussian_a_jac, **self.curve_fit_options())
+                    except RuntimeError:
+                        popt = None
+                    if popt is not None and not (np.all(popt >= bounds[0]) and np.all(popt <= bounds[1])):
+                        popt = None
+                if popt is None:
+                    popt, pcov = curve_fit(self.gaussian_a, x_fit, y_bg_sub, p0=p0, bounds=bounds,
+                                           jac=self.gaussian_a_jac, **self.curve_fit_options())
                 
                 # Calculate fitted curve
                 fit_curve = self.gaussian_a(x_fit, *popt) + self.linear_background(x_fit, m_bg, b_bg)
@@ -930,7 +1559,7 @@ class XRFPeakFitter:
                     'fwhm': popt[2],
                     'background_slope': m_bg,
                     'background_intercept': b_bg,
-                    'actual_peak_area': popt[0] * popt[2] * np.sqrt(np.pi / np.log(2)),  # Proper Gaussian-A area
+                    'actual_peak_area': popt[0] * popt[2] * _GA_AREA_CONST,  # Proper Gaussian-A area
                     'amplitude_error': np.sqrt(pcov[0,0]),
                     'center_error': np.sqrt(pcov[1,1]),
                     'fwhm_error': np.sqrt(pcov[2,2])
@@ -952,6 +1581,61 @@ class XRFPeakFitter:
         except Exception as e:
             raise RuntimeError(f"Fitting failed: {str(e)}")
     
+    def fit_batch(self, x, Y, peak_region=None, max_iter=100):
+        """
+        Fit the Gaussian-A peak plus linear background to a stack of spectra
+        sharing one energy axis
+        
+        Uses the same fitting region, initial guesses and bounds as
+        fit_peak with background_subtract=True. With numba the fits run in
+        a compiled Levenberg-Marquardt loop; otherwise curve_fit is called
+        for each spectrum.
+        
+        Parameters:
+        - x: energy array shared by all spectra
+        - Y: 2-D intensity array, one spectrum per row
+        - peak_region: tuple (min_energy, max_energy) for fitting region
+        - max_iter: maximum Levenberg-Marquardt iterations per spectrum
+        
+        Returns:
+        - params: (N, 5) array of [a, x0, dx, m, b] per spectrum
+        """
+        if peak_region is None:
+            peak_region, _ = self.get_peak_regions()
+        
+        x = np.asarray(x, dtype=np.float64)
+        Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+        
+        # Select fitting region
+        index = self.region_index(x, peak_region)
+        x_fit = np.ascontiguousarray(x[index])
+        Y_fit = np.ascontiguousarray(Y[:, index])
+        
+        if x_fit.size < 5:
+            raise ValueError("Insufficient data points in fitting region")
+        if not (np.isfinite(x_fit).all() and np.isfinite(Y_fit).all()):
+            raise ValueError("Fitting region contains NaN or infinite values")
+        
+        # Initial guesses as in fit_peak: [a, x0, dx, m, b]
+        P0 = np.empty((Y_fit.shape[0], 5))
+        P0[:, 0] = Y_fit.max(axis=1)
+        P0[:, 1] = x_fit[np.argmax(Y_fit, axis=1)]
+        P0[:, 2] = 0.1
+        for k, y_fit in enumerate(Y_fit):
+            P0[k, 3:] = self.estimate_background(x_fit, y_fit, peak_region)
+        
+        # Bounds for parameters [a, x0, dx, m, b]
+        lower, upper = peak_fit_bounds(float(peak_region[0]), float(peak_region[1]))
+        
+        if HAS_NUMBA:
+            return _fit_batch(x_fit, Y_fit, P0, lower, upper, max_iter)
+        
+        params = np.empty_like(P0)
+        for k, y_fit in enumerate(Y_fit):
+            params[k], _ = curve_fit(self.combined_model, x_fit, y_fit, p0=P0[k], bounds=(lower, upper),
+                                     jac=self.combined_model_jac, **self.curve_fit_options())
+        return params
+    
     def fit_pb_as_deconvolution(self, x, y):
         """
         Simultaneous deconvolution of Pb and As peaks using multiple characteristic lines.
@@ -985,56 +1669,66 @@ class XRFPeakFitter:
         
         # Define fitting region covering all peaks (10-13 keV)
         fit_region = (9.8, 13.2)
-        mask = (x >= fit_region[0]) & (x <= fit_region[1])
-        x_fit = x[mask]
-        y_fit = y[mask]
+        index = self.region_index(x, fit_region)
+        x_fit = x[index]
+        y_fit = y[index]
         
         if len(x_fit) < 20:
             raise ValueError("Insufficient data points for Pb-As deconvolution")
         
-        # Estimate background
-        bg_mask = ((x_fit < 10.0) | (x_fit > 13.0))
-        if np.sum(bg_mask) > 2:
-            m_bg, b_bg = np.polyfit(x_fit[bg_mask], y_fit[bg_mask], 1)
+        # Estimate background: closed-form line through the points outside 10-13 keV
+        n_bg, sx, sy, sxx, sxy = _background_sums(np.require(x_fit, dtype=np.float64, requirements='C'),
+                                                  np.require(y_fit, dtype=np.float64, requirements='C'),
+                                                  10.0, 13.0)
+        denom = n_bg * sxx - sx * sx
+        if n_bg > 2 and denom != 0:
+            m_bg = (n_bg * sxy - sx * sy) / denom
+            b_bg = (sy - m_bg * sx) / n_bg
         else:
             m_bg = 0
             b_bg = np.min(y_fit)
         
+        # Line energies and intensity ratios as arrays for the broadcast model
+        pb_energies = np.array([line['energy'] for line in pb_lines.values()])
+        pb_ratios = np.array([line['rel_intensity'] / 100.0 for line in pb_lines.values()])
+        as_energies = np.array([line['energy'] for line in as_lines.values()])
+        as_ratios = np.array([line['rel_intensity'] / 100.0 for line in as_lines.values()])
+        
         # Define multi-peak model
         def multi_peak_model(x, pb_amp, as_amp, fwhm_pb, fwhm_as, m, b):
             """
             Model with all Pb and As characteristic lines.
-            Amplitudes are constrained by theoretical intensity ratios.
+            Amplitudes are constrained by theoretical intensity ratios
+            (Pb relative to Lα1, As relative to Kα1).
             """
-            model = np.zeros_like(x)
-            
-            # Pb peaks (using Lα1 amplitude as reference)
-            for line_name, line_data in pb_lines.items():
-                amplitude = pb_amp * (line_data['rel_intensity'] / 100.0)
-                model += self.gaussian_a(x, amplitude, line_data['energy'], fwhm_pb)
-            
-            # As peaks (using Kα1 amplitude as reference)
-            for line_name, line_data in as_lines.items():
-                amplitude = as_amp * (line_data['rel_intensity'] / 100.0)
-                model += self.gaussian_a(x, amplitude, line_data['energy'], fwhm_as)
-            
-            # Add background
-            model += m * x + b
-            
-            return model
+            return (line_family_model(x, pb_amp, pb_energies, pb_ratios, fwhm_pb) +
+                    line_family_model(x, as_amp, as_energies, as_ratios, fwhm_as) +
+                    m * x + b)
+        
+        def multi_peak_jac(x, pb_amp, as_amp, fwhm_pb, fwhm_as, m, b):
+            """Analytic Jacobian of multi_peak_model; line amplitudes scale linearly"""
+            x = np.asarray(x, dtype=np.float64)
+            jac = np.empty((x.size, 6))
+            jac[:, 0], jac[:, 2] = line_family_jacobian(x, pb_amp, pb_energies, pb_ratios, fwhm_pb)
+            jac[:, 1], jac[:, 3] = line_family_jacobian(x, as_amp, as_energies, as_ratios, fwhm_as)
+            jac[:, 4] = x
+            jac[:, 5] = 1.0
+            return jac
+        
+        # Initial parameter estimates (x_fit is ascending whenever its window was a slice)
+        ascending = isinstance(index, slice)
         
-        # Initial parameter estimates
         # Find peak around 10.5 keV (overlapped Pb Lα + As Kα)
-        overlap_mask = (x_fit >= 10.3) & (x_fit <= 10.7)
-        overlap_height = np.max(y_fit[overlap_mask]) if np.sum(overlap_mask) > 0 else 1000
+        overlap = y_fit[energy_window(x_fit, (10.3, 10.7), ascending)]
+        overlap_height = np.max(overlap) if overlap.size > 0 else 1000
         
         # Find As Kβ peak around 11.7 keV (well separated)
-        as_kb_mask = (x_fit >= 11.5) & (x_fit <= 11.9)
-        as_kb_height = np.max(y_fit[as_kb_mask]) if np.sum(as_kb_mask) > 0 else 100
+        as_kb = y_fit[energy_window(x_fit, (11.5, 11.9), ascending)]
+        as_kb_height = np.max(as_kb) if as_kb.size > 0 else 100
         
         # Find Pb Lβ peak around 12.6 keV (well separated)
-        pb_lb_mask = (x_fit >= 12.4) & (x_fit <= 12.8)
-        pb_lb_height = np.max(y_fit[pb_lb_mask]) if np.sum(pb_lb_mask) > 0 else 100
+        pb_lb = y_fit[energy_window(x_fit, (12.4, 12.8), ascending)]
+        pb_lb_height = np.max(pb_lb) if pb_lb.size > 0 else 100
         
         # Estimate initial amplitudes based on separated peaks
         # As Kβ1 has 62% intensity relative to Kα1
@@ -1053,8 +1747,12 @@ class XRFPeakFitter:
         )
         
         try:
+            if not (np.isfinite(x_fit).all() and np.isfinite(y_fit).all()):
+                raise ValueError("Fitting region contains NaN or infinite values")
+            
             # Perform fit
-            popt, pcov = curve_fit(multi_peak_model, x_fit, y_fit, p0=p0, bounds=bounds, maxfev=10000)
+            popt, pcov = curve_fit(multi_peak_model, x_fit, y_fit, p0=p0, bounds=bounds, maxfev=10000,
+                                   jac=multi_peak_jac, **self.curve_fit_options())
             
             pb_amp, as_amp, fwhm_pb, fwhm_as, m, b = popt
             
@@ -1068,17 +1766,11 @@ class XRFPeakFitter:
             
             # Calculate integrated intensities for each element
             # Pb: integrate all Pb peaks
-            pb_intensity = 0
-            for line_name, line_data in pb_lines.items():
-                amplitude = pb_amp * (line_data['rel_intensity'] / 100.0)
-                # Gaussian-A area = amplitude * fwhm * sqrt(pi/ln(2))
-                pb_intensity += amplitude * fwhm_pb * np.sqrt(np.pi / np.log(2))
+            # Gaussian-A area = amplitude * fwhm * sqrt(pi/ln(2)), summed over the lines
+            pb_intensity = pb_amp * pb_ratios.sum() * fwhm_pb * _GA_AREA_CONST
             
             # As: integrate all As peaks
-            as_intensity = 0
-            for line_name, line_data in as_lines.items():
-                amplitude = as_amp * (line_data['rel_intensity'] / 100.0)
-                as_intensity += amplitude * fwhm_as * np.sqrt(np.pi / np.log(2))
+            as_intensity = as_amp * as_ratios.sum() * fwhm_as * _GA_AREA_CONST
             
             # Apply calibrations
             pb_concentration = None
@@ -1131,16 +1823,16 @@ class SampleGroup:
         if not self.spectra_data:
             return
         
-        # Extract values
-        integrated_intensities = [data[2] for data in self.spectra_data]
-        concentrations = [data[3] for data in self.spectra_data]
+        # Extract (integrated intensity, concentration) pairs straight into one array
+        self.n_spectra = len(self.spectra_data)
+        values = np.fromiter(chain.from_iterable((data[2], data[3]) for data in self.spectra_data),
+                             dtype=np.float64, count=2 * self.n_spectra).reshape(self.n_spectra, 2)
         
-        # Calculate statistics
-        self.n_spectra = len(integrated_intensities)
-        self.mean_integrated_intensity = np.mean(integrated_intensities)
-        self.std_integrated_intensity = np.std(integrated_intensities, ddof=1) if len(integrated_intensities) > 1 else 0
-        self.mean_concentration = np.mean(concentrations)
-        self.std_concentration = np.std(concentrations, ddof=1) if len(concentrations) > 1 else 0
+        # Calculate statistics for both columns at once
+        means = values.mean(axis=0)
+        stds = values.std(axis=0, ddof=1) if self.n_spectra > 1 else (0, 0)
+        self.mean_integrated_intensity, self.mean_concentration = means
+        self.std_integrated_intensity, self.std_concentration = stds
         
         # Calculate relative standard deviation (RSD)
         self.rsd_integrated_intensity = (self.std_integrated_intensity / self.mean_integrated_intensity * 100) if self.mean_integrated_intensity != 0 else 0
@@ -1169,6 +1861,8 @@ class PlotCanvas(FigureCanvas):
         
         # Store current data for zoom updates
         self.current_spectrum_data = None
+        # Energy axes of the current plot known to be ascending (checked once per plot)
+        self._ascending_axes = ()
         
         # Connect to zoom/pan events for auto Y-scaling
         self.setup_zoom_events()
@@ -1228,6 +1922,8 @@ class PlotCanvas(FigureCanvas):
 
             # Store current spectrum data for zoom event handling
             self.current_spectrum_data = (x, y, fit_x, fit_y, background_x, background_y)
+            self._ascending_axes = tuple(axis for axis in (x, fit_x, background_x)
+                                         if axis is not None and is_ascending(axis))
 
             # 1. Save current zoom window (if any), else use display_min/max or default
             try:
@@ -1301,31 +1997,19 @@ class PlotCanvas(FigureCanvas):
             if x_min is None or x_max is None:
                 x_min, x_max = self.ax1.get_xlim()
             
-            # Collect all Y values within the X zoom window
-            all_y_values = []
-            
-            # Raw data within zoom window
-            mask = (x >= x_min) & (x <= x_max)
-            if mask.any():
-                all_y_values.extend(y[mask])
-            
-            # Fit data within zoom window
-            if fit_x is not None and fit_y is not None:
-                fit_mask = (fit_x >= x_min) & (fit_x <= x_max)
-                if fit_mask.any():
-                    all_y_values.extend(fit_y[fit_mask])
-            
-            # Background data within zoom window
-            if background_x is not None and background_y is not None:
-                bg_mask = (background_x >= x_min) & (background_x <= x_max)
-                if bg_mask.any():
-                    all_y_values.extend(background_y[bg_mask])
+            # Running Y range over the raw data, fit and background within the X zoom window
+            y_min, y_max = np.inf, -np.inf
+            for series_x, series_y in ((x, y), (fit_x, fit_y), (background_x, background_y)):
+                if series_x is None or series_y is None:
+                    continue
+                known = any(series_x is axis for axis in self._ascending_axes)
+                visible = series_y[energy_window(series_x, (x_min, x_max), True if known else None)]
+                if visible.size:
+                    y_min = min(y_min, visible.min())
+                    y_max = max(y_max, visible.max())
             
             # Calculate Y limits with some padding
-            if all_y_values:
-                y_min = min(all_y_values)
-                y_max = max(all_y_values)
-                
+            if y_min <= y_max:
                 # Add 5% padding on both sides
                 y_range = y_max - y_min
                 if y_range > 0:
@@ -1438,6 +2122,77 @@ class PlotCanvas(FigureCanvas):
         self.fig.tight_layout()
         self.draw()
 
+def fit_batch_file(fitter, file_path, fitting_params, p0=None):
+    """
+    Read and fit one file of a single-element batch
+    
+    p0 optionally warm-starts the peak fit (see XRFPeakFitter.fit_peak).
+    
+    Returns:
+    result: dict stored by ProcessingThread for the file
+    """
+    data = read_xrf_file(file_path)
+    if data is None:
+        raise ValueError("Could not read file")
+    
+    x, y = data
+    
+    # Fit peak
+    fit_params, fit_curve, r_squared, x_fit, integrated_intensity, concentration = fitter.fit_peak(
+        x, y, 
+        peak_region=(fitting_params['peak_min'], fitting_params['peak_max']),
+        background_subtract=fitting_params['background_subtract'],
+        integration_region=(fitting_params['integration_min'], fitting_params['integration_max']),
+        p0=p0
+    )
+    
+    # Store results (spectrum kept as float32 to halve batch memory)
+    x_data, y_data = compact_spectrum(x, y)
+    return {
+        'filename': os.path.basename(file_path),
+        'filepath': file_path,
+        'fit_params': fit_params,
+        'r_squared': r_squared,
+        'integrated_intensity': integrated_intensity,
+        'concentration': concentration,
+        'x_data': x_data,
+        'y_data': y_data,
+        'fit_x': x_fit,
+        'fit_y': fit_curve
+    }
+
+def iter_sample_fits(fitter, file_paths, fitting_params):
+    """
+    Fit the replicate spectra of one sample in order, yielding (result, error message)
+    
+    Each fit starts from the previous successful replicate's peak parameters,
+    which are close to its own, so the optimiser needs fewer iterations.
+    """
+    p0 = None
+    for file_path in file_paths:
+        try:
+            result = fit_batch_file(fitter, file_path, fitting_params, p0)
+        except Exception as e:
+            yield None, str(e)
+            continue
+        params = result['fit_params']
+        p0 = (params['amplitude'], params['center'], params['fwhm'])
+        yield result, None
+
+# Shared state for batch worker processes (set once per worker by _init_batch_worker)
+_worker_fitter = None
+_worker_fitting_params = None
+
+def _init_batch_worker(fitter, fitting_params):
+    """Store the fitter and fitting parameters in a worker process"""
+    global _worker_fitter, _worker_fitting_params
+    _worker_fitter = fitter
+    _worker_fitting_params = fitting_params
+
+def _fit_sample_worker(file_paths):
+    """Worker: fit one sample's files with the worker's fitter"""
+    return list(iter_sample_fits(_worker_fitter, file_paths, _worker_fitting_params))
+
 class ProcessingThread(QThread):
     """Thread for batch processing XRF files with sample grouping"""
     
@@ -1451,6 +2206,65 @@ class ProcessingThread(QThread):
         self.fitting_params = fitting_params
         self.spectra_per_sample = spectra_per_sample
         self.fitter = XRFPeakFitter()
+    
+    # Batches at least this long are fitted in worker processes; smaller ones
+    # finish before the workers would have started
+    parallel_min_files = 100
+    
+    def iter_file_results(self):
+        """
+        Fit every file, yielding (index, result, error message) as each finishes
+        
+        Files are fitted sample by sample (spectra_per_sample consecutive
+        files), each replicate warm-started from the one before. Large
+        batches spread the samples over worker processes, so samples may
+        complete out of order. Workers are spawned rather than forked because
+        this runs inside a Qt thread. If the pool itself breaks, the samples
+        it did not finish are fitted in this thread instead.
+        """
+        n_files = len(self.file_paths)
+        samples = [range(start, min(start + self.spectra_per_sample, n_files))
+                   for start in range(0, n_files, self.spectra_per_sample)]
+        n_workers = min(os.cpu_count() or 1, len(samples))
+        if n_files < self.parallel_min_files or n_workers < 2:
+            for indices in samples:
+                sample_files = [self.file_paths[i] for i in indices]
+                for i, (result, error) in zip(indices, iter_sample_fits(self.fitter, sample_files, self.fitting_params)):
+                    yield i, result, error
+            return
+        
+        # Files are fitted with per-file error handling inside the workers, so
+        # an exception from the pool means a worker process failed (e.g. it
+        # could not start); such samples are refitted here, reported once
+        pool_error = None
+        refit = []
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_batch_worker,
+                                 initargs=(self.fitter, self.fitting_params)) as executor:
+            futures = {}
+            for indices in samples:
+                try:
+                    futures[executor.submit(_fit_sample_worker, [self.file_paths[i] for i in indices])] = indices
+                except Exception as e:
+                    pool_error = pool_error or e
+                    refit.append(indices)
+            for future in as_completed(futures):
+                indices = futures[future]
+                try:
+                    outcomes = future.result()
+                except Exception as e:
+                    pool_error = pool_error or e
+                    refit.append(indices)
+                    continue
+                for i, (result, error) in zip(indices, outcomes):
+                    yield i, result, error
+        
+        if pool_error is not None:
+            print(f"Worker process failed ({pool_error}); fitting {len(refit)} sample(s) in this thread")
+            for indices in sorted(refit, key=lambda indices: indices.start):
+                sample_files = [self.file_paths[i] for i in indices]
+                for i, (result, error) in zip(indices, iter_sample_fits(self.fitter, sample_files, self.fitting_params)):
+                    yield i, result, error
         
     def run(self):
         """Process all files in the list with sample grouping"""
@@ -1458,50 +2272,19 @@ class ProcessingThread(QThread):
         sample_groups = []
         
         try:
-            for i, file_path in enumerate(self.file_paths):
-                try:
-                    # Read XRF data
-                    data = self.read_xrf_file(file_path)
-                    
-                    if data is None:
-                        self.error_occurred.emit(file_path, "Could not read file")
-                        continue
-                    
-                    x, y = data
-                    
-                    # Fit peak
-                    fit_params, fit_curve, r_squared, x_fit, integrated_intensity, concentration = self.fitter.fit_peak(
-                        x, y, 
-                        peak_region=(self.fitting_params['peak_min'], self.fitting_params['peak_max']),
-                        background_subtract=self.fitting_params['background_subtract'],
-                        integration_region=(self.fitting_params['integration_min'], self.fitting_params['integration_max'])
-                    )
-                    
-                    # Store results
-                    result = {
-                        'filename': os.path.basename(file_path),
-                        'filepath': file_path,
-                        'fit_params': fit_params,
-                        'r_squared': r_squared,
-                        'integrated_intensity': integrated_intensity,
-                        'concentration': concentration,
-                        'x_data': x,
-                        'y_data': y,
-                        'fit_x': x_fit,
-                        'fit_y': fit_curve
-                    }
-                    
-                    results.append(result)
-                    
-                    # Emit progress
-                    progress_value = min(98, int((i + 1) / len(self.file_paths) * 98))  # Cap at 98% during file processing
-                    self.progress.emit(progress_value)
-                    
-                except Exception as e:
-                    self.error_occurred.emit(file_path, str(e))
-                    # Still emit progress even for failed files
-                    progress_value = min(98, int((i + 1) / len(self.file_paths) * 98))
-                    self.progress.emit(progress_value)
+            # Results are kept in file order for sample grouping
+            ordered = [None] * len(self.file_paths)
+            for done, (i, result, error) in enumerate(self.iter_file_results(), 1):
+                if error is None:
+                    ordered[i] = result
+                else:
+                    self.error_occurred.emit(self.file_paths[i], error)
+                
+                # Emit progress, even for failed files
+                progress_value = min(98, int(done / len(self.file_paths) * 98))  # Cap at 98% during file processing
+                self.progress.emit(progress_value)
+            
+            results = [result for result in ordered if result is not None]
             
             # Group results by sample (this can take some time)
             self.progress.emit(99)  # Show 99% while grouping
@@ -1540,22 +2323,7 @@ class ProcessingThread(QThread):
         
         return sample_groups
     
-    def read_xrf_file(self, file_path):
-        """Read XRF data from various file formats using smart detection"""
-        try:
-            # Use the smart parser that automatically detects file format
-            x, y, format_type = parse_xrf_file_smart(file_path)
-            
-            if x is not None and y is not None:
-                print(f"Successfully parsed {os.path.basename(file_path)} as {format_type} format")
-                return x, y
-            else:
-                print(f"Failed to parse {file_path} with smart parser")
-                return None
-                
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
-            return None
+    read_xrf_file = staticmethod(read_xrf_file)
 
 class MultiElementProcessingThread(QThread):
     """Thread for multi-element batch processing of XRF files"""
@@ -1632,12 +2400,13 @@ class MultiElementProcessingThread(QThread):
                                 'concentration': 0
                             }
                     
-                    # Store multi-element results
+                    # Store multi-element results (spectrum kept as float32 to halve batch memory)
+                    x_data, y_data = compact_spectrum(x, y)
                     result = {
                         'filename': os.path.basename(file_path),
                         'filepath': file_path,
-                        'x_data': x,
-                        'y_data': y,
+                        'x_data': x_data,
+                        'y_data': y_data,
                         'element_results': element_results,
                         'selected_elements': self.selected_elements
                     }
@@ -1705,21 +2474,7 @@ class MultiElementProcessingThread(QThread):
         
         return sample_groups
     
-    def read_xrf_file(self, file_path):
-        """Read XRF data from various file formats using smart detection"""
-        try:
-            x, y, format_type = parse_xrf_file_smart(file_path)
-            
-            if x is not None and y is not None:
-                print(f"Successfully parsed {os.path.basename(file_path)} as {format_type} format")
-                return x, y
-            else:
-                print(f"Failed to parse {file_path} with smart parser")
-                return None
-                
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
-            return None
+    read_xrf_file = staticmethod(read_xrf_file)
 
 class XRFPeakFittingGUI(QMainWindow):
     """Main GUI application for XRF peak fitting with calibration and sample grouping"""
@@ -2395,8 +3150,8 @@ class XRFPeakFittingGUI(QMainWindow):
         
         if folder_path:
             # Get all files in the folder first, then let user filter by extension
-            all_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                        if os.path.isfile(os.path.join(folder_path, f))]
+            with os.scandir(folder_path) as entries:
+                all_files = [entry.path for entry in entries if entry.is_file()]
             
             if all_files:
                 # Show sorting dialog with extension filtering
@@ -2427,22 +3182,7 @@ class XRFPeakFittingGUI(QMainWindow):
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Error loading file: {str(e)}")
     
-    def read_xrf_file(self, file_path):
-        """Read XRF data from file using smart format detection"""
-        try:
-            # Use the smart parser that automatically detects file format
-            x, y, format_type = parse_xrf_file_smart(file_path)
-            
-            if x is not None and y is not None:
-                print(f"Successfully parsed {os.path.basename(file_path)} as {format_type} format")
-                return x, y
-            else:
-                print(f"Failed to parse {file_path} with smart parser")
-                return None
-                
-        except Exception as e:
-            print(f"Error reading {file_path}: {e}")
-            return None
+    read_xrf_file = staticmethod(read_xrf_file)
     
     def fit_single_file(self):
         """Fit a single XRF file for all selected elements"""
@@ -3297,49 +4037,11 @@ Calibrated Concentration: {concentration:.4f}
             self.batch_folder_label.setText(f"{len(self.sorted_file_paths)} files sorted and ready")
             self.fit_batch_btn.setEnabled(True)
     
-    def natural_sort_key(self, filename):
-        """Generate a key for natural sorting of filenames"""
-        import re
-        
-        # Extract the base filename without path
-        basename = os.path.basename(filename)
-        
-        # Split the filename into text and number parts
-        def convert(text):
-            return int(text) if text.isdigit() else text.lower()
-        
-        # Use regex to split on numbers
-        alphanum_key = [convert(c) for c in re.split('([0-9]+)', basename)]
-        return alphanum_key
-    
-    def smart_sort_files(self, file_paths):
-        """Sort files using natural sorting (handles numbers correctly)"""
-        return sorted(file_paths, key=self.natural_sort_key)
-    
-    def detect_sorting_pattern(self, file_paths):
-        """Detect the naming pattern in the files"""
-        if not file_paths:
-            return "unknown"
-        
-        # Get just the filenames
-        filenames = [os.path.basename(f) for f in file_paths]
-        
-        # Check for common patterns
-        patterns = {
-            "sample_number": r"sample_(\d+)",
-            "sample_number_extended": r"sample_(\d+)_",
-            "number_only": r"^(\d+)",
-            "letter_number": r"([A-Za-z]+)(\d+)",
-            "date_pattern": r"(\d{4})[-_](\d{2})[-_](\d{2})",
-            "time_pattern": r"(\d{2})[-:](\d{2})[-:](\d{2})"
-        }
-        
-        for pattern_name, pattern in patterns.items():
-            matches = [re.search(pattern, f) for f in filenames]
-            if all(matches):
-                return pattern_name
-        
-        return "unknown"
+    natural_sort_key = staticmethod(natural_sort_key)
+    
+    smart_sort_files = staticmethod(smart_sort_files)
+    
+    detect_sorting_pattern = staticmethod(detect_sorting_pattern)
     
 
     
@@ -4196,7 +4898,8 @@ Calibrated Concentration: {concentration:.4f}
         
         element_matches = {}
         
-        for element, lines in XRF_LINES_DB.items():
+        lines_by_element, _ = xrf_lines_db()
+        for element, lines in lines_by_element.items():
             # Skip X-ray tube element
             if tube_element and element == tube_element:
                 continue
@@ -4923,22 +5626,7 @@ Calibrated Concentration: {concentration:.4f}
     def _get_certified_concentration(self, std_name, element_symbol):
         """Helper method to get certified concentration for a standard and element"""
         if std_name in REFERENCE_MATERIALS:
-            cert_value = REFERENCE_MATERIALS[std_name].get(element_symbol)
-            if cert_value and cert_value != "N/A":
-                try:
-                    if isinstance(cert_value, str):
-                        if '%' in cert_value:
-                            if '<' in cert_value:
-                                return None
-                            return float(cert_value.replace('%', '')) * 10000
-                        elif '<' in cert_value:
-                            return None
-                        else:
-                            return float(cert_value)
-                    else:
-                        return float(cert_value)
-                except (ValueError, TypeError):
-                    return None
+            return reference_concentration(std_name, element_symbol)
         elif hasattr(self, 'custom_standards_data') and std_name in self.custom_standards_data:
             if element_symbol in self.custom_standards_data[std_name]:
                 return self.custom_standards_data[std_name][element_symbol]
@@ -5028,29 +5716,7 @@ Calibrated Concentration: {concentration:.4f}
         current_element = self.element_combo.currentText()
         
         # Collect available standards for this element
-        available_standards = []
-        concentrations = []
-        
-        for material_name, material_data in REFERENCE_MATERIALS.items():
-            value = material_data.get(current_element)
-            if value is not None and value != "N/A":
-                # Parse concentration value
-                try:
-                    if isinstance(value, str):
-                        # Handle percentage values
-                        if '%' in value:
-                            if '<' in value:
-                                continue  # Skip below detection limit values
-                            conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                        else:
-                            conc = float(value)
-                    else:
-                        conc = float(value)
-                    
-                    available_standards.append(material_name)
-                    concentrations.append(conc)
-                except (ValueError, TypeError):
-                    continue
+        available_standards, concentrations = reference_standards(current_element)
         
         if len(available_standards) < 2:
             QMessageBox.warning(self, "Insufficient Standards", 
@@ -5162,27 +5828,7 @@ Calibrated Concentration: {concentration:.4f}
         current_element = self.element_combo.currentText()
         
         # Collect data for plotting
-        materials = []
-        concentrations = []
-        
-        for material_name, material_data in REFERENCE_MATERIALS.items():
-            value = material_data.get(current_element)
-            if value is not None and value != "N/A":
-                try:
-                    if isinstance(value, str):
-                        if '%' in value:
-                            if '<' in value:
-                                continue
-                            conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                        else:
-                            conc = float(value)
-                    else:
-                        conc = float(value)
-                    
-                    materials.append(material_name)
-                    concentrations.append(conc)
-                except (ValueError, TypeError):
-                    continue
+        materials, concentrations = reference_standards(current_element)
         
         if not materials:
             QMessageBox.information(self, "No Data", f"No certified values available for {current_element}.")
@@ -5224,27 +5870,7 @@ Calibrated Concentration: {concentration:.4f}
         current_element = self.element_combo.currentText()
         
         # Collect available standards for this element
-        available_standards = []
-        concentrations = []
-        
-        for material_name, material_data in REFERENCE_MATERIALS.items():
-            value = material_data.get(current_element)
-            if value is not None and value != "N/A":
-                try:
-                    if isinstance(value, str):
-                        if '%' in value:
-                            if '<' in value:
-                                continue  # Skip below detection limit values
-                            conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                        else:
-                            conc = float(value)
-                    else:
-                        conc = float(value)
-                    
-                    available_standards.append(material_name)
-                    concentrations.append(conc)
-                except (ValueError, TypeError):
-                    continue
+        available_standards, concentrations = reference_standards(current_element)
         
         if len(available_standards) < 2:
             QMessageBox.warning(self, "Insufficient Standards", 
@@ -5639,8 +6265,7 @@ Calibrated Concentration: {concentration:.4f}
         
         if reply == QMessageBox.StandardButton.Yes:
             # Clear all calibrations
-            self.calibration_manager.calibrations = {}
-            self.calibration_manager.save_calibrations()
+            self.calibration_manager.clear_calibrations()
             
             # Reset fitters to defaults
             for element in ELEMENT_DEFINITIONS.keys():
@@ -5737,27 +6362,7 @@ Calibrated Concentration: {concentration:.4f}
         calibratable_elements = []
         
         for element in ELEMENT_DEFINITIONS.keys():
-            available_standards = []
-            concentrations = []
-            
-            for material_name, material_data in REFERENCE_MATERIALS.items():
-                value = material_data.get(element)
-                if value is not None and value != "N/A":
-                    try:
-                        if isinstance(value, str):
-                            if '%' in value:
-                                if '<' in value:
-                                    continue  # Skip below detection limit values
-                                conc = float(value.replace('%', '')) * 10000  # Convert % to ppm
-                            else:
-                                conc = float(value)
-                        else:
-                            conc = float(value)
-                        
-                        available_standards.append(material_name)
-                        concentrations.append(conc)
-                    except (ValueError, TypeError):
-                        continue
+            available_standards, concentrations = reference_standards(element)
             
             if len(available_standards) >= 2:
                 calibratable_elements.append((element, available_standards, concentrations))
@@ -6284,26 +6889,8 @@ Calibrated Concentration: {concentration:.4f}
                                 continue  # This material doesn't have this element
                             
                             # Get the certified concentration for this element in this material
-                            if material not in REFERENCE_MATERIALS:
-                                continue
-                            material_data = REFERENCE_MATERIALS[material]
-                            cert_value = material_data.get(element)
-                            
-                            if cert_value is None or cert_value == "N/A":
-                                continue
-                            
-                            # Parse concentration
-                            try:
-                                if isinstance(cert_value, str):
-                                    if '%' in cert_value:
-                                        if '<' in cert_value:
-                                            continue
-                                        cert_conc = float(cert_value.replace('%', '')) * 10000
-                                    else:
-                                        cert_conc = float(cert_value)
-                                else:
-                                    cert_conc = float(cert_value)
-                            except (ValueError, TypeError):
+                            cert_conc = reference_concentration(material, element)
+                            if cert_conc is None:
                                 continue
                         
                         # Create element-specific fitter
@@ -7343,7 +7930,7 @@ def detect_file_format(file_path):
         print(f"Error detecting file format for {file_path}: {e}")
         return 'unknown'
 
-def parse_xrf_file_smart(file_path):
+def parse_xrf_file_smart(file_path, format_type=None):
     """
     Smart parser for XRF data files that automatically detects and handles various formats.
     
@@ -7351,6 +7938,9 @@ def parse_xrf_file_smart(file_path):
     -----------
     file_path : str
         Path to the XRF data file
+    format_type : str, optional
+        Format already known for this file (e.g. from detect_file_format);
+        detection is skipped when given
         
     Returns:
     --------
@@ -7363,7 +7953,8 @@ def parse_xrf_file_smart(file_path):
     """
     try:
         # Detect file format
-        format_type = detect_file_format(file_path)
+        if format_type is None:
+            format_type = detect_file_format(file_path)
         print(f"Detected format for {os.path.basename(file_path)}: {format_type}")
         
         if format_type == 'emsa':
@@ -7398,48 +7989,64 @@ def parse_xrf_file_smart(file_path):
         print(f"Error in smart parsing of {file_path}: {e}")
         return None, None, 'error'
 
+@lru_cache(maxsize=256)
+def _cached_parse(file_path, mtime_ns, size, format_type=None):
+    """Parse a file once per (path, modification time, size) key"""
+    x, y, format_type = parse_xrf_file_smart(file_path, format_type)
+    for array in (x, y):
+        if array is not None:
+            array.setflags(write=False)  # Shared between callers
+    return x, y, format_type
+
+def parse_xrf_file_cached(file_path, format_type=None):
+    """
+    Memoized parse_xrf_file_smart for repeated reads of unchanged files
+    
+    Results are keyed on the file's path, modification time and size, so a
+    file is re-parsed when it changes. The returned arrays are shared between
+    callers and therefore read-only.
+    """
+    stat = os.stat(file_path)
+    return _cached_parse(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, format_type)
+
+def _read_data_block(source, sep):
+    """
+    Read energy and intensity from the first two columns of a numeric data block
+    
+    Parsing is done by pandas' C reader; rows whose first two fields are not
+    both numeric are dropped.
+    """
+    df = pd.read_csv(source, sep=sep, header=None, usecols=[0, 1], comment='#',
+                     skipinitialspace=True, engine='c')
+    data = df.apply(pd.to_numeric, errors='coerce').dropna().to_numpy(dtype=np.float64)
+    return data[:, 0], data[:, 1]
+
+def _data_after_marker(file_path, markers):
+    """Return the text following the first line containing one of markers, or None"""
+    with open(file_path, 'r') as f:
+        text = f.read()
+    
+    for marker in markers:
+        pos = text.find(marker)
+        if pos != -1:
+            start = text.find('\n', pos)
+            return text[start + 1:] if start != -1 else ''
+    return None
+
 def parse_nist_standard_format(file_path, format_type):
     """Parse NIST standard files with header and 3 columns"""
     try:
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-        
-        data_lines = []
-        in_data_section = False
+        # Data lines (energy, intensity, baseline) follow the data section marker
+        data_text = _data_after_marker(file_path, ["Data Starts Here", "Data\tStarts\tHere"])
+        if not data_text or not data_text.strip():
+            raise ValueError("No valid data found in file")
         
-        for line in lines:
-            line = line.strip()
-            
-            # Skip empty lines
-            if not line:
-                continue
-            
-            # Check for data section start
-            if "Data Starts Here" in line or "Data	Starts	Here" in line:
-                in_data_section = True
-                continue
-            
-            # Parse data lines (should have 3 columns: energy, intensity, baseline)
-            if in_data_section:
-                # Split by tabs or spaces
-                parts = line.split()
-                if len(parts) >= 2:
-                    try:
-                        energy = float(parts[0])
-                        intensity = float(parts[1])
-                        data_lines.append([energy, intensity])
-                    except ValueError:
-                        # Skip lines that can't be parsed as numbers
-                        continue
+        # Split by tabs or spaces
+        x, y = _read_data_block(io.StringIO(data_text), sep=r'\s+')
         
-        if not data_lines:
+        if len(x) == 0:
             raise ValueError("No valid data found in file")
         
-        # Convert to numpy arrays
-        data_array = np.array(data_lines)
-        x = data_array[:, 0]
-        y = data_array[:, 1]
-        
         return x, y, format_type
         
     except Exception as e:
@@ -7449,37 +8056,16 @@ def parse_nist_standard_format(file_path, format_type):
 def parse_csv_format(file_path, format_type):
     """Parse CSV format files with mixed header and data content"""
     try:
-        # Read file line by line to handle mixed content
-        data_lines = []
-        in_data_section = False
-        
-        with open(file_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                
-                # Skip empty lines
-                if not line:
-                    continue
-                
-                # Check for data section start
-                if "Data begins below" in line or "Data starts below" in line:
-                    in_data_section = True
-                    continue
-                
-                # Parse data lines (should have 2 columns: energy, intensity)
-                if in_data_section and not line.startswith('#'):
-                    # Split by comma and clean up
-                    parts = [part.strip() for part in line.split(',')]
-                    if len(parts) >= 2:
-                        try:
-                            energy = float(parts[0])
-                            intensity = float(parts[1])
-                            data_lines.append([energy, intensity])
-                        except ValueError:
-                            # Skip lines that can't be parsed as numbers
-                            continue
+        # Data lines (energy, intensity) may follow a data section marker
+        x = y = None
+        data_text = _data_after_marker(file_path, ["Data begins below", "Data starts below"])
+        if data_text and data_text.strip():
+            try:
+                x, y = _read_data_block(io.StringIO(data_text), sep=',')
+            except ValueError:
+                x = y = None
         
-        if not data_lines:
+        if x is None or len(x) == 0:
             # If no data section found, try to parse the whole file
             try:
                 # First try with header
@@ -7520,11 +8106,6 @@ def parse_csv_format(file_path, format_type):
             
             raise ValueError("No valid data found in file")
         
-        # Convert to numpy arrays
-        data_array = np.array(data_lines)
-        x = data_array[:, 0]
-        y = data_array[:, 1]
-        
         return x, y, format_type
         
     except Exception as e:
@@ -7824,4 +8405,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == '__main__':
+    # Needed by the batch worker pool in frozen (packaged) builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file